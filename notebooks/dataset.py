@@ -1,3 +1,5 @@
+import operator
+
 from vp import horizon_finder
 
 
@@ -28,19 +30,24 @@ class Dataset(object):
         self.image_gt_horizon = image_gt_horizon
         principal_point = (self.image_dims[0] // 2, self.image_dims[1] // 2)
 
-        if self.image_gt_vertical_vp is None:
-            self.image_gt_vertical_vp = []
-            for gt_vps in image_gt_vps:
-                vertical_vp = horizon_finder.choose_vertical_vanishing_point(
-                    gt_vps, principal_point)
-                self.image_gt_vertical_vp.append(vertical_vp)
-
-        if self.image_gt_horizon is None:
-            self.image_gt_horizon = []
+        if self.image_gt_vertical_vp is None or self.image_gt_horizon is None:
+            # Derive whatever's missing in a single pass over the images.
+            find_vertical_vps = self.image_gt_vertical_vp is None
+            find_horizons = self.image_gt_horizon is None
+            if find_vertical_vps:
+                self.image_gt_vertical_vp = []
+            if find_horizons:
+                self.image_gt_horizon = []
             for i, gt_vps in enumerate(image_gt_vps):
-                vertical_vp = self.image_gt_vertical_vp[i]
-                self.image_gt_horizon.append(horizon_finder.find_horizon(
-                    gt_vps, principal_point, vertical_vanishing_point=vertical_vp))
+                if find_vertical_vps:
+                    vertical_vp = horizon_finder.choose_vertical_vanishing_point(
+                        gt_vps, principal_point)
+                    self.image_gt_vertical_vp.append(vertical_vp)
+                else:
+                    vertical_vp = self.image_gt_vertical_vp[i]
+                if find_horizons:
+                    self.image_gt_horizon.append(horizon_finder.find_horizon(
+                        gt_vps, principal_point, vertical_vanishing_point=vertical_vp))
 
     def with_mask(self, indices):
         """Returns a new Dataset with a masked subset of images.
@@ -51,10 +58,29 @@ class Dataset(object):
         Returns:
             Dataset instance.
         """
+        indices = list(indices)
         return Dataset(
-            [self.image_paths[i] for i in indices],
+            take(self.image_paths, indices),
             self.image_dims,
-            [self.image_gt_vps[i] for i in indices],
-            [self.image_gt_segments[i] for i in indices],
-            [self.image_gt_vertical_vp[i] for i in indices],
-            [self.image_gt_horizon[i] for i in indices])
+            take(self.image_gt_vps, indices),
+            take(self.image_gt_segments, indices),
+            take(self.image_gt_vertical_vp, indices),
+            take(self.image_gt_horizon, indices))
+
+
+def take(items, indices):
+    """Selects items from a list by index.
+
+    Args:
+        items: List.
+        indices: List of integer indices.
+
+    Returns:
+        List of the selected items, in the order of indices.
+    """
+    if len(indices) == 0:
+        return []
+    elif len(indices) == 1:
+        # itemgetter returns a bare item, rather than a tuple, for one index.
+        return [items[indices[0]]]
+    return list(operator.itemgetter(*indices)(items))
@@ -1,5 +1,11 @@
+import concurrent.futures
+import functools
 import itertools
+import multiprocessing
+import os
+import pickle
 import time
+import warnings
 
 import cv2
 from matplotlib import pyplot as plt
@@ -8,65 +14,255 @@ import numpy as np
 from vp import draw_tools
 from vp import horizon_finder
 from vp import scoring
+from dataset import take
 from print_progress import print_progress
 
 HORIZON_LINE_COLOR = (255, 255, 0)
 BAD_LINES_COLOR = (0, 55, 0)
+# Default number of decoded images that visualize_vp_detection_results keeps
+# in memory, so visualizing the same images again, e.g. the same sample for
+# results of another method, doesn't decode them again. Detection doesn't use
+# the cache. A 1920 x 1080 image takes about 6MB. See
+# set_image_cache_size().
+IMAGE_CACHE_SIZE = 32
 
 
-def batch_detect_vps_and_score(dataset, detection_func, show_progress_bar=True):
+def batch_detect_vps_and_score(
+        dataset, detection_func, show_progress_bar=True, num_workers=None):
     """Finds vanishing points and detection error vs ground truth.
 
+    Detection runs in a pool of worker processes, one image per task, which
+    also decode the images. Results are collected in dataset order, and scored
+    in this process.
+
     Args:
         dataset: Dataset instance. Contains image and ground truth info.
         detection_func: Function taking a cv2 image, and returning
             a tuple of:
-                Dict of VP tuple to list of constituent lines.
+                (K, 2) array of VPs.
+                List of K line groups, the constituent lines of each VP.
                 List of outlier lines. Lines are in [x1, y1, x2, y2] format.
+            For compatibility, a tuple of a dict of VP tuple to list of
+            constituent lines, and the outlier lines, is also accepted.
+            If worker processes can't run it (e.g. a lambda, or a function
+            defined in a notebook when workers aren't forked), threads are
+            used instead of processes.
         show_progress_bar: Boolean, whether to print a progress bar.
+        num_workers: Integer, number of parallel workers. Defaults to the
+            number of CPUs. Use 1 to run everything in this process.
 
     Returns:
         VPResults instance.
     """
-    image_vp_to_lines = []
+    image_vps = []
+    image_line_groups = []
     image_horizon_params = []
     image_bad_lines = []
-    horizon_errors = []
     num_model_errors = []
     vp_direction_errors = []
     location_errors = []
     detection_times = []
     principal_point = (dataset.image_dims[0] // 2, dataset.image_dims[1] // 2)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
 
-    image_paths = dataset.image_paths
+    detections = _detect_all(
+        dataset.image_paths, detection_func, principal_point, num_workers)
     if show_progress_bar:
-        image_paths = print_progress(dataset.image_paths)
-    for i, image_path in enumerate(image_paths):
-        image = cv2.imread(image_path)
-
-        detection_time_secs = time.time()
-        vp_to_lines, bad_lines = detection_func(image)
-        detection_time_secs = time.time() - detection_time_secs
+        detections = print_progress(detections, total=len(dataset.image_paths))
+    for i, detection in enumerate(detections):
+        vps, line_groups, bad_lines, horizon_params, detection_time_secs = detection
         detection_times.append(detection_time_secs)
-        horizon_params = horizon_finder.find_horizon(vp_to_lines.keys(), principal_point)
         image_horizon_params.append(horizon_params)
 
-        image_vp_to_lines.append(vp_to_lines)
+        image_vps.append(vps)
+        image_line_groups.append(line_groups)
         image_bad_lines.append(bad_lines)
-        horizon_errors.append(scoring.horizon_error(
-            dataset.image_gt_horizon[i], horizon_params, dataset.image_dims))
         num_model_errors.append(scoring.num_model_detection_error(
-            dataset.image_gt_vps[i], vp_to_lines.keys()))
+            dataset.image_gt_vps[i], vps))
         vp_direction_errors.append(scoring.vp_direction_error(
-            dataset.image_gt_vps[i], vp_to_lines.keys(), dataset.image_dims))
+            dataset.image_gt_vps[i], vps, dataset.image_dims))
         location_errors.append(scoring.location_accuracy_error(
-            dataset.image_gt_vps[i], vp_to_lines.keys()))
+            dataset.image_gt_vps[i], vps))
+    horizon_errors = scoring.horizon_error_batch(
+        dataset.image_gt_horizon, image_horizon_params, dataset.image_dims)
     return VPResults(
-        image_vp_to_lines, image_horizon_params, image_bad_lines,
+        image_vps, image_line_groups, image_horizon_params, image_bad_lines,
         horizon_errors, num_model_errors, vp_direction_errors,
         location_errors, detection_times)
 
 
+def _detect_all(image_paths, detection_func, principal_point, num_workers):
+    """Runs _detect_one over a list of images, in parallel.
+
+    Args:
+        image_paths: List of string image paths.
+        detection_func: See batch_detect_vps_and_score.
+        principal_point: Tuple, camera center on the projection.
+        num_workers: Integer, number of parallel workers.
+
+    Yields:
+        Each result of _detect_one, in the same order as image_paths.
+    """
+    detect = functools.partial(
+        _detect_one, detection_func=detection_func, principal_point=principal_point)
+    if num_workers <= 1:
+        yield from map(detect, image_paths)
+        return
+    chunksize = max(1, len(image_paths) // (4 * num_workers))
+    num_done = 0
+    if _can_run_in_processes(detection_func):
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=num_workers) as executor:
+                for result in executor.map(
+                        detect, image_paths, chunksize=chunksize):
+                    yield result
+                    num_done += 1
+            return
+        except concurrent.futures.process.BrokenProcessPool:
+            # E.g. a worker couldn't unpickle the detection function.
+            warnings.warn(
+                'Detection worker processes failed, continuing with threads.')
+    # Detection is mostly OpenCV and numpy, which release the GIL.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        yield from executor.map(
+            detect, image_paths[num_done:], chunksize=chunksize)
+
+
+def _detect_one(image_path, detection_func, principal_point):
+    """Finds vanishing points and the horizon for a single image.
+
+    Args:
+        image_path: String image path.
+        detection_func: See batch_detect_vps_and_score.
+        principal_point: Tuple, camera center on the projection.
+
+    Returns:
+        Tuple of:
+            1) (K, 2) array of VPs.
+            2) List of K line groups, the constituent lines of each VP.
+            3) List of outlier lines.
+            4) Horizon line in (slope, intercept) format.
+            5) Float detection time in seconds.
+    """
+    # Not cached, so the detection function is free to modify the image.
+    image = _decode_image(image_path)
+
+    detection_time_secs = time.time()
+    vps, line_groups, bad_lines = _as_vp_arrays(detection_func(image))
+    detection_time_secs = time.time() - detection_time_secs
+    horizon_params = horizon_finder.find_horizon(vps, principal_point)
+    return vps, line_groups, bad_lines, horizon_params, detection_time_secs
+
+
+def _as_vp_arrays(detection):
+    """Converts a detection function's output to VP and line group arrays.
+
+    Args:
+        detection: Either a tuple of (VPs, line groups, outlier lines), or
+            a tuple of (dict of VP tuple to line group, outlier lines).
+
+    Returns:
+        Tuple of (K, 2) float array of VPs, list of K line groups, and
+        outlier lines.
+    """
+    if len(detection) == 2:
+        vp_to_lines, bad_lines = detection
+        vps = list(vp_to_lines)
+        line_groups = list(vp_to_lines.values())
+    else:
+        vps, line_groups, bad_lines = detection
+    vps = np.asarray(vps, dtype=np.float64).reshape(-1, 2)
+    return vps, list(line_groups), bad_lines
+
+
+def clear_image_cache():
+    """Frees all decoded images kept for reuse."""
+    _load_image.cache_clear()
+
+
+def set_image_cache_size(size):
+    """Sets how many decoded images are kept for reuse by visualizations.
+
+    This also frees all images cached so far.
+
+    Args:
+        size: Integer number of images. 0 disables caching, and None removes
+            the limit.
+    """
+    global _load_image
+    _load_image = functools.lru_cache(maxsize=size)(_decode_shared_image)
+
+
+def _decode_image(image_path):
+    """Decodes an image file.
+
+    Only call this where pixel data is needed. Datasets carry image dimensions,
+    so nothing else has to open the file.
+
+    Args:
+        image_path: String image path.
+
+    Returns:
+        cv2 image instance.
+
+    Raises:
+        IOError, if the image can't be read.
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        raise IOError('Unable to read image %s.' % image_path)
+    return image
+
+
+def _decode_shared_image(image_path):
+    """Decodes an image file for the image cache.
+
+    The image is shared with later callers, so it's read-only.
+    """
+    image = _decode_image(image_path)
+    image.setflags(write=False)
+    return image
+
+
+# Decodes an image file, keeping the most recent images for reuse, so that
+# visualizing the same results again doesn't decode them again.
+_load_image = functools.lru_cache(maxsize=IMAGE_CACHE_SIZE)(_decode_shared_image)
+
+
+def _can_run_in_processes(func):
+    """Checks whether a function can be run in worker processes.
+
+    Functions are pickled by reference. Forked workers inherit everything
+    defined in this process, but workers started any other way (e.g. spawned,
+    on Windows and macOS) import modules afresh, so can't find functions
+    defined in __main__, e.g. in a notebook cell.
+
+    Args:
+        func: Callable.
+
+    Returns:
+        Boolean.
+    """
+    if not _is_picklable(func):
+        return False
+    if multiprocessing.get_start_method() == 'fork':
+        return True
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, '__module__', None) != '__main__'
+
+
+def _is_picklable(obj):
+    """Checks whether an object can be sent to a worker process."""
+    try:
+        pickle.dumps(obj)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
 def show_results_summary(dataset, results):
     """Plots and prints a summary of detection results.
 
@@ -83,10 +279,10 @@ def show_results_summary(dataset, results):
 
     print('\nThis shows the horizon error if we always guessed a flat, '
           'image-center horizon, i.e., no algorithm at all.')
-    fixed_horizon_error = [
-        scoring.horizon_error(
-            gt, (0, dataset.image_dims[1] // 2), dataset.image_dims)
-        for gt in dataset.image_gt_horizon]
+    fixed_horizon_error = scoring.horizon_error_batch(
+        dataset.image_gt_horizon,
+        [(0, dataset.image_dims[1] // 2)] * len(dataset.image_gt_horizon),
+        dataset.image_dims)
     auc = histogram_cumulative(
         fixed_horizon_error, range=(0, .25), title='Fixed-horizon error cumulative')
     print(('\t%0.2f%% of the images had a horizon closer to the center of the image '
@@ -131,7 +327,7 @@ def visualize_vp_detection_results(dataset, vp_results, mask_indices=None):
         mask_indices = range(len(dataset.image_paths))
     for i in mask_indices:
         # Build an image with ground truth information.
-        image = cv2.imread(dataset.image_paths[i])
+        image = _load_image(dataset.image_paths[i])
         gt_image = _build_results_image(
             image,
             dataset.image_gt_vps[i],
@@ -140,10 +336,11 @@ def visualize_vp_detection_results(dataset, vp_results, mask_indices=None):
             dataset.image_gt_horizon[i])
 
         # Build an image with detection results.
+        line_groups = vp_results.image_line_groups[i]
         working_image = _build_results_image(
             image,
-            vp_results.image_vp_to_lines[i].keys(),
-            vp_results.image_vp_to_lines[i].values(),
+            vp_results.image_vps[i],
+            line_groups,
             vp_results.image_bad_lines[i],
             vp_results.image_horizon_params[i])
 
@@ -155,7 +352,7 @@ def visualize_vp_detection_results(dataset, vp_results, mask_indices=None):
             vp_results.horizon_errors[i],
             ', '.join(['%0.2f' % e if e is not None else 'NA'
                        for e in vp_results.vp_direction_errors[i]]),
-            [len(vs) for vs in vp_results.image_vp_to_lines[i].values()]))
+            [len(lines) for lines in line_groups]))
 
 
 def _build_results_image(image, vps, segments, bad_segments, horizon_params):
@@ -163,7 +360,7 @@ def _build_results_image(image, vps, segments, bad_segments, horizon_params):
 
     Args:
         image: cv2 image instance.
-        vps: List of vanishing point tuples.
+        vps: List or (K, 2) array of vanishing points.
         segments: List of contributing line segments, grouped by vanishing point.
             Lines are in [x1, y1, x2, y2] format.
         bad_segments: Outlier segments.
@@ -172,6 +369,7 @@ def _build_results_image(image, vps, segments, bad_segments, horizon_params):
     Returns:
         cv2 image instance.
     """
+    # The image is usually shared with the image cache, so draw on a copy.
     image = image.copy()
     im_height, im_width, _ = image.shape
     if len(bad_segments) > 0:
@@ -192,13 +390,15 @@ class VPResults(object):
     """Stores VP detection results for a batch of images."""
 
     def __init__(
-            self, image_vp_to_lines, image_horizon_params, image_bad_lines,
+            self, image_vps, image_line_groups, image_horizon_params, image_bad_lines,
             horizon_errors, num_model_errors, vp_direction_errors,
             location_errors, detection_times):
         """Constructor.
 
         Args:
-            image_vp_to_lines: List of dicts of VP tuple to constituent line set.
+            image_vps: List of (K, 2) arrays of VPs, one per image.
+            image_line_groups: List of lists of K line groups, the constituent
+                lines of each VP, one per image.
             image_horizon_params: List of (slope, intercept) tuples, or None if
                 detection failed for that image.
             image_bad_lines: List of outlier lines, one per image.
@@ -208,7 +408,8 @@ class VPResults(object):
             location_errors: List of float average location errors.
             detection_times: List of float processing time in seconds.
         """
-        self.image_vp_to_lines = image_vp_to_lines
+        self.image_vps = image_vps
+        self.image_line_groups = image_line_groups
         self.image_horizon_params = image_horizon_params
         self.image_bad_lines = image_bad_lines
         self.horizon_errors = horizon_errors
@@ -226,15 +427,17 @@ class VPResults(object):
         Returns:
             VPResults instance.
         """
+        indices = list(indices)
         return VPResults(
-            [self.image_vp_to_lines[i] for i in indices],
-            [self.image_horizon_params[i] for i in indices],
-            [self.image_bad_lines[i] for i in indices],
-            [self.horizon_errors[i] for i in indices],
-            [self.num_model_errors[i] for i in indices],
-            [self.vp_direction_errors[i] for i in indices],
-            [self.location_errors[i] for i in indices],
-            [self.detection_times[i] for i in indices])
+            take(self.image_vps, indices),
+            take(self.image_line_groups, indices),
+            take(self.image_horizon_params, indices),
+            take(self.image_bad_lines, indices),
+            take(self.horizon_errors, indices),
+            take(self.num_model_errors, indices),
+            take(self.vp_direction_errors, indices),
+            take(self.location_errors, indices),
+            take(self.detection_times, indices))
 
 
 def histogram(data, bins=None, title=None, y_thresh=True):
@@ -247,8 +450,9 @@ def histogram(data, bins=None, title=None, y_thresh=True):
         y_thresh: Optional bool or float y value at which to plot a
             threshold line. True will use the number of data points.
     """
+    data = np.asarray(data)
     if bins is None:
-        counts, bins = np.histogram(np.array(data))
+        counts, bins = np.histogram(data)
         plt.ylim(ymax=max(counts), ymin=0)
     else:
         plt.ylim(ymax=len(data), ymin=0)
@@ -260,8 +464,7 @@ def histogram(data, bins=None, title=None, y_thresh=True):
     elif y_thresh is not False:
         plt.axhline(y=y_thresh, linewidth=1)
     plt.show()
-    print('\tMedian: %0.2f. Max: %0.2f' % (
-        np.median(data), max(data)))
+    print('\tMedian: %0.2f. Max: %0.2f' % (np.median(data), data.max()))
 
 
 def histogram_cumulative(data, range, title=None, y_thresh=True):
@@ -277,7 +480,8 @@ def histogram_cumulative(data, range, title=None, y_thresh=True):
     Returns:
         Float, ratio of results that fell within the given range..
     """
-    counts, bins = np.histogram(np.array(data), range=range)
+    data = np.asarray(data)
+    counts, bins = np.histogram(data, range=range)
     plt.hist(data, bins=bins, cumulative=True, histtype='step')
     if title is not None:
         plt.title(title)
@@ -287,4 +491,4 @@ def histogram_cumulative(data, range, title=None, y_thresh=True):
         plt.axhline(y=y_thresh, linewidth=1)
     plt.show()
     print('\tMedian: %0.2f.' % np.median(data))
-    return sum(counts) / len(data)
+    return counts.sum() / len(data)
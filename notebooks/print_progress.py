@@ -1,12 +1,16 @@
+from tqdm.auto import tqdm
 
 
-def print_progress(iterable):
+def print_progress(iterable, total=None):
     """Prints a progress bar as something is iterated over.
 
+    Output is throttled, so this is cheap even for many small items.
+
+    Args:
+        iterable: Iterable to track.
+        total: Optional integer number of items, for iterables without a length.
+
     Yields:
         Each item in iterable.
     """
-    for i in iterable:
-        yield i
-        print('.', end='')
-    print('')
+    yield from tqdm(iterable, total=total)
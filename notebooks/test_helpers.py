@@ -0,0 +1,94 @@
+import concurrent.futures
+import functools
+import unittest
+from unittest import mock
+
+import helpers
+
+
+def _detect(image):
+    return [], [], []
+
+
+def _detect_one(image_path, detection_func, principal_point):
+    return image_path
+
+
+class _BrokenProcessPoolExecutor(object):
+    """Stands in for a process pool whose workers die after one result."""
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, func, iterable, chunksize=1):
+        yield func(next(iter(iterable)))
+        raise concurrent.futures.process.BrokenProcessPool()
+
+
+class TestCanRunInProcesses(unittest.TestCase):
+
+    def test_module_function(self):
+        for start_method in ('fork', 'spawn'):
+            with mock.patch(
+                    'multiprocessing.get_start_method',
+                    return_value=start_method):
+                self.assertTrue(helpers._can_run_in_processes(_detect))
+
+    @mock.patch.object(helpers, '_is_picklable', return_value=True)
+    def test_main_function(self, _):
+        # Functions in __main__ pickle by reference, so pickling succeeds.
+        with mock.patch(
+                'multiprocessing.get_start_method', return_value='fork'):
+            self.assertTrue(helpers._can_run_in_processes(_detect_in_main))
+        with mock.patch(
+                'multiprocessing.get_start_method', return_value='spawn'):
+            self.assertFalse(helpers._can_run_in_processes(_detect_in_main))
+            self.assertFalse(helpers._can_run_in_processes(
+                functools.partial(_detect_in_main)))
+
+    def test_lambda(self):
+        self.assertFalse(helpers._can_run_in_processes(lambda image: image))
+
+
+class TestDetectAll(unittest.TestCase):
+
+    def setUp(self):
+        self.image_paths = ['%d.png' % i for i in range(5)]
+
+    def test_main_function_uses_threads_when_spawning(self):
+        with mock.patch.object(helpers, '_detect_one', _detect_one), \
+                mock.patch.object(
+                    helpers, '_is_picklable', return_value=True), \
+                mock.patch(
+                    'multiprocessing.get_start_method', return_value='spawn'), \
+                mock.patch.object(
+                    concurrent.futures, 'ProcessPoolExecutor',
+                    side_effect=AssertionError('Used processes.')):
+            self.assertEqual(
+                list(helpers._detect_all(
+                    self.image_paths, _detect_in_main, (0, 0), 2)),
+                self.image_paths)
+
+    def test_broken_process_pool_falls_back_to_threads(self):
+        with mock.patch.object(helpers, '_detect_one', _detect_one), \
+                mock.patch.object(
+                    concurrent.futures, 'ProcessPoolExecutor',
+                    _BrokenProcessPoolExecutor), \
+                self.assertWarns(UserWarning):
+            self.assertEqual(
+                list(helpers._detect_all(self.image_paths, _detect, (0, 0), 2)),
+                self.image_paths)
+
+
+def _detect_in_main(image):
+    return [], [], []
+
+
+# As if defined in a notebook cell.
+_detect_in_main.__module__ = '__main__'
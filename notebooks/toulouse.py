@@ -1,5 +1,7 @@
 import json
 import os
+import pickle
+import tempfile
 
 from vp import geom_tools
 
@@ -9,11 +11,18 @@ from print_progress import print_progress
 IMAGE_EXTENSION = 'jpg'
 # Pixel dimensions of the images in the dataset.
 IMAGE_DIMS = (1920, 1080)
+# Ground truth derived from the segment files is cached here, in the dataset
+# directory. Bump the version whenever that derivation changes.
+GT_CACHE_FILE_NAME = '.vp_gt_cache.pkl'
+GT_CACHE_VERSION = 1
 
 
 def load_dataset(dataset_path, show_progress_bar=True):
     """Loads the Toulouse vanishing point dataset.
 
+    Ground truth is cached on disk, and only recomputed for segment files
+    that changed since the last load.
+
     Args:
         dataset_path: String, path to a directory.
         show_progress_bar: Boolean, whether to print a progress bar.
@@ -24,6 +33,9 @@ def load_dataset(dataset_path, show_progress_bar=True):
     image_paths = []
     image_gt_segments = []
     image_gt_vps = []
+    cache_path = os.path.join(dataset_path, GT_CACHE_FILE_NAME)
+    cache = _read_gt_cache(cache_path)
+    cache_changed = False
     entries = os.listdir(dataset_path)
     if show_progress_bar:
         entries = print_progress(entries)
@@ -35,14 +47,86 @@ def load_dataset(dataset_path, show_progress_bar=True):
         if extension != IMAGE_EXTENSION:
             continue
         image_paths.append(os.path.join(dataset_path, file_name))
-        with open(os.path.join(
-                dataset_path, '%s.txt' % file_base_name), 'r') as f:
-            gt_segments = json.loads(f.read())['segments']
-        gt_vps = []
-        for vp_segments in gt_segments:
-            gt_vps.append(geom_tools.find_point_cluster_average(
-                geom_tools.find_all_intersections(
-                    vp_segments)))
+        gt_path = os.path.join(dataset_path, '%s.txt' % file_base_name)
+        mtime = os.path.getmtime(gt_path)
+        cached = cache.get(file_base_name)
+        if cached is not None and cached[0] == mtime:
+            _, gt_segments, gt_vps = cached
+        else:
+            gt_segments, gt_vps = _load_gt(gt_path)
+            cache[file_base_name] = (mtime, gt_segments, gt_vps)
+            cache_changed = True
         image_gt_segments.append(gt_segments)
         image_gt_vps.append(gt_vps)
+    if cache_changed:
+        _write_gt_cache(cache_path, cache)
     return dataset.Dataset(image_paths, IMAGE_DIMS, image_gt_vps, image_gt_segments)
+
+
+def _load_gt(gt_path):
+    """Loads and derives ground truth for a single image.
+
+    Args:
+        gt_path: String, path to the image's segments file.
+
+    Returns:
+        Tuple of list of ground truth line segments per VP, and list of
+        ground truth VP point tuples.
+    """
+    with open(gt_path, 'rb') as f:
+        # json detects the encoding of bytes input itself.
+        gt_segments = json.loads(f.read())['segments']
+    gt_vps = []
+    for vp_segments in gt_segments:
+        gt_vps.append(geom_tools.find_point_cluster_average(
+            geom_tools.find_all_intersection_points(
+                vp_segments)))
+    return gt_segments, gt_vps
+
+
+def _read_gt_cache(cache_path):
+    """Reads the ground truth cache.
+
+    Args:
+        cache_path: String, path to the cache file.
+
+    Returns:
+        Dict of image base name to (segments file mtime, ground truth segments,
+        ground truth VPs). Empty if there's no usable cache.
+    """
+    # A corrupt or foreign pickle can fail in many ways, and just means the
+    # ground truth is parsed again.
+    try:
+        with open(cache_path, 'rb') as f:
+            version, cache = pickle.load(f)
+    except (OSError, EOFError, ValueError, TypeError, AttributeError,
+            ImportError, pickle.UnpicklingError):
+        return {}
+    if version != GT_CACHE_VERSION or not isinstance(cache, dict):
+        return {}
+    return cache
+
+
+def _write_gt_cache(cache_path, cache):
+    """Writes the ground truth cache, atomically.
+
+    Failures are ignored, since the cache is only an optimization.
+
+    Args:
+        cache_path: String, path to the cache file.
+        cache: Dict, as returned by _read_gt_cache.
+    """
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((GT_CACHE_VERSION, cache), f)
+        os.replace(temp_path, cache_path)
+    except (OSError, pickle.PicklingError):
+        # Don't leave a partial file behind in the dataset directory.
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
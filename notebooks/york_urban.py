@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 
 import numpy as np
@@ -15,6 +16,8 @@ IMAGE_DIMS = (640, 480)
 def load_dataset(dataset_path, show_progress_bar=True):
     """Loads the York Urban vanishing point dataset.
 
+    Entries are loaded in parallel, in a pool of worker processes.
+
     Args:
         dataset_path: String, path to a directory.
         show_progress_bar: Boolean, whether to print a progress bar.
@@ -22,39 +25,52 @@ def load_dataset(dataset_path, show_progress_bar=True):
     Returns:
         Dataset instance.
     """
-    image_paths = []
-    image_gt_vps = []
-    image_gt_segments = []
     # Images paths are <base>/<base>.jpg.
     # VP data paths are <base>/<base>LinesAndVP.mat.
-    entries = os.listdir(dataset_path)
-    if show_progress_bar:
-        entries = print_progress(entries)
-    for entry in entries:
-        if not os.path.isdir(os.path.join(dataset_path, entry)):
-            continue
-        image_file_name = os.path.join(entry, '%s.%s' % (entry, IMAGE_EXTENSION))
-        image_paths.append(os.path.join(dataset_path, image_file_name))
-        gt_data = scipy.io.loadmat(os.path.join(
-            dataset_path, entry, '%sLinesAndVP.mat' % entry))
-        gt_segments = [[], [], []]
-        # Lines are in a flattened array of (x, y) point tuples.
-        lines = gt_data['lines']
-        # Labels are 1-3, one per line.
-        vp_labels = gt_data['vp_association']
-        for i in range(len(lines) // 2):
-            gt_segments[int(vp_labels[i]) - 1].append([
-                lines[i * 2][0],
-                lines[i * 2][1],
-                lines[i * 2 + 1][0],
-                lines[i * 2 + 1][1]])
-        gt_vps = []
-        for vp_segments in gt_segments:
-            if len(vp_segments) > 0:
-                vx, vy = geom_tools.find_point_cluster_average(
-                    geom_tools.find_all_intersections(vp_segments))
-                if not np.isnan(vx) and not np.isnan(vy):
-                    gt_vps.append((vx, vy))
-        image_gt_segments.append(gt_segments)
-        image_gt_vps.append(gt_vps)
+    entries = [entry for entry in os.listdir(dataset_path)
+               if os.path.isdir(os.path.join(dataset_path, entry))]
+    with multiprocessing.Pool() as pool:
+        results = pool.imap(
+            _load_entry, [(dataset_path, entry) for entry in entries])
+        if show_progress_bar:
+            results = print_progress(results, total=len(entries))
+        results = list(results)
+    image_paths = [image_path for image_path, _, _ in results]
+    image_gt_segments = [gt_segments for _, gt_segments, _ in results]
+    image_gt_vps = [gt_vps for _, _, gt_vps in results]
     return dataset.Dataset(image_paths, IMAGE_DIMS, image_gt_vps, image_gt_segments)
+
+
+def _load_entry(args):
+    """Loads a single image's entry in the York Urban dataset.
+
+    Args:
+        args: Tuple of string dataset path, string entry (subdirectory) name.
+
+    Returns:
+        Tuple of:
+            1) String image path.
+            2) List of ground truth line segments, per VP.
+            3) List of ground truth VP point tuples.
+    """
+    dataset_path, entry = args
+    image_file_name = os.path.join(entry, '%s.%s' % (entry, IMAGE_EXTENSION))
+    image_path = os.path.join(dataset_path, image_file_name)
+    gt_data = scipy.io.loadmat(os.path.join(
+        dataset_path, entry, '%sLinesAndVP.mat' % entry))
+    # Lines are in a flattened array of (x, y) point tuples, so each pair of
+    # rows is one segment. An unpaired trailing point is dropped.
+    points = np.asarray(gt_data['lines'])
+    segments = points[:len(points) // 2 * 2].reshape(-1, 4)
+    # Labels are 1-3, one per line.
+    vp_labels = np.asarray(gt_data['vp_association']).ravel()[:len(segments)]
+    gt_segments = [segments[vp_labels == label].tolist()
+                   for label in (1, 2, 3)]
+    gt_vps = []
+    for vp_segments in gt_segments:
+        if len(vp_segments) > 0:
+            vx, vy = geom_tools.find_point_cluster_average(
+                geom_tools.find_all_intersection_points(vp_segments))
+            if not np.isnan(vx) and not np.isnan(vy):
+                gt_vps.append((vx, vy))
+    return image_path, gt_segments, gt_vps
@@ -1,9 +1,22 @@
+import collections
+import hashlib
 import math
+import threading
 
 import cv2
+import numpy as np
 
+# Maximum number of distinct data sets whose kmeans results are remembered.
+# Data sets are keyed by a digest, so each entry only holds the labels and
+# centers of each clustering tried, about 4 bytes per data point per
+# clustering.
+KMEANS_CACHE_SIZE = 128
 
-def cluster_xmeans(data_points, max_clusters=100):
+_kmeans_cache = collections.OrderedDict()
+_kmeans_cache_lock = threading.Lock()
+
+
+def cluster_xmeans(data_points, max_clusters=100, patience=2):
     """Clusters data points into an unspecified number of clusters.
 
     The number of clusters is arrived at via Bayesian Information Criterion (BIC),
@@ -15,6 +28,9 @@ def cluster_xmeans(data_points, max_clusters=100):
         data_points: List of data points.
         max_clusters: Integer, a hard limit on the maximum number of clusters.
             Can be None for no limit.
+        patience: Integer, how many splits in a row may fail to improve BIC
+            before giving up. Kmeans is randomized, so one bad split doesn't
+            mean the next one will be bad too.
 
     Returns:
         Array of labels for each data point.
@@ -23,18 +39,23 @@ def cluster_xmeans(data_points, max_clusters=100):
     if max_clusters is None:
         max_clusters = math.inf
 
-    best_labels, best_centers = cluster_kmeans(data_points, num_clusters)
-    best_clustering_score = _score_clustering(data_points, best_labels, best_centers)
+    data_key = _get_cache_key(data_points)
+    best_labels, _, best_clustering_score = _cluster_and_score(
+        data_points, num_clusters, data_key)
+    num_stale_splits = 0
     while num_clusters < len(data_points) and num_clusters <= max_clusters:
         num_clusters += 1
-        labels, centers = cluster_kmeans(data_points, num_clusters)
-        clustering_score = _score_clustering(data_points, labels, centers)
+        labels, _, clustering_score = _cluster_and_score(
+            data_points, num_clusters, data_key)
         if clustering_score < best_clustering_score:
             best_labels = labels
             best_clustering_score = clustering_score
+            num_stale_splits = 0
         else:
-            # Results are no longer improving with additional clusters.
-            break
+            num_stale_splits += 1
+            if num_stale_splits >= patience:
+                # Results are no longer improving with additional clusters.
+                break
     return best_labels
 
 
@@ -60,7 +81,59 @@ def cluster_kmeans(data_points, num_clusters, max_iterations=100, max_accuracy=0
     _, labels, centers = cv2.kmeans(
         data=data_points, K=num_clusters, bestLabels=None, criteria=criteria,
         attempts=3, flags=cv2.KMEANS_RANDOM_CENTERS)
-    return [l[0] for l in labels], centers
+    return labels.ravel(), centers
+
+
+def clear_kmeans_cache():
+    """Forgets all remembered kmeans results."""
+    with _kmeans_cache_lock:
+        _kmeans_cache.clear()
+
+
+def _cluster_and_score(data_points, num_clusters, data_key):
+    """Clusters data points with kmeans, and scores the clustering.
+
+    Results are remembered, so repeated calls with the same data and
+    number of clusters skip kmeans entirely. Each call returns its own copies
+    of the arrays, so callers may modify them.
+
+    Args:
+        data_points: List of data points.
+        num_clusters: Integer.
+        data_key: Cache key for data_points. See _get_cache_key.
+
+    Returns:
+        Tuple of array of labels, array of centers, float score.
+    """
+    with _kmeans_cache_lock:
+        results = _kmeans_cache.get(data_key)
+        if results is not None:
+            _kmeans_cache.move_to_end(data_key)
+            result = results.get(num_clusters)
+        else:
+            result = None
+
+    if result is None:
+        labels, centers = cluster_kmeans(data_points, num_clusters)
+        result = labels, centers, _score_clustering(data_points, labels, centers)
+        with _kmeans_cache_lock:
+            _kmeans_cache.setdefault(data_key, {})[num_clusters] = result
+            _kmeans_cache.move_to_end(data_key)
+            while len(_kmeans_cache) > KMEANS_CACHE_SIZE:
+                _kmeans_cache.popitem(last=False)
+    labels, centers, score = result
+    return labels.copy(), centers.copy(), score
+
+
+def _get_cache_key(data_points):
+    """Builds a hashable key identifying the contents of a data point array.
+
+    The contents are keyed by a digest, so the key's size doesn't depend on
+    the number of data points.
+    """
+    data_points = np.ascontiguousarray(data_points)
+    digest = hashlib.blake2b(data_points, digest_size=16).digest()
+    return data_points.dtype.str, data_points.shape, digest
 
 
 def _score_clustering(data_points, labels, centers):
@@ -100,43 +173,6 @@ def _get_total_cluster_sse(data_points, labels, centers):
     Returns:
         float, sum of squared error.
     """
-    center_to_group_data_points = {}
-    for i, point in enumerate(data_points):
-        group_center = tuple(centers[labels[i]])
-        center_to_group_data_points.setdefault(group_center, []).append(point)
-    within_group_sse = 0
-    for center, group_points in center_to_group_data_points.items():
-        within_group_sse += _get_cluster_sse(group_points, center)
-    return within_group_sse
-
-
-def _get_cluster_sse(data_points, center):
-    """Calculates sum of squared error in a single cluster.
-
-    Args:
-        data_points: List of data points.
-        center: Cluster center.
-
-    Returns:
-        float, sum of squared error.
-    """
-    variance = 0
-    for point in data_points:
-        variance += _get_distance_between_points(
-            tuple(center), tuple(point)) ** 2
-    return variance
-
-
-def _get_distance_between_points(point_a, point_b):
-    """Gets distance between two points of any dimensionality.
-
-    Args:
-        point_a: Tuple of any size.
-        point_b: Tuple of any size.
-
-    Returns:
-        float, distance.
-    """
-    num_dimensions = len(point_a)
-    return math.sqrt(sum([abs(point_a[i] - point_b[i]) ** 2
-                          for i in range(num_dimensions)]))
+    errors = (np.asarray(data_points, dtype=np.float64) -
+              np.asarray(centers, dtype=np.float64)[np.asarray(labels)])
+    return float(np.einsum('ij,ij->', errors, errors))
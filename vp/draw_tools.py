@@ -1,4 +1,6 @@
 import cv2
+import numpy as np
+
 from vp import geom_tools
 
 # Based on "The Best of Metro Colors" https://www.color-hex.com/color-palette/861
@@ -10,8 +12,11 @@ DRAW_PALETTE = [
 
 
 def draw_lines(lines, dest_image, color=(0, 0, 255), thickness=2):
-    for x1, y1, x2, y2 in lines:
-        cv2.line(dest_image, (int(x1), int(y1)), (int(x2), int(y2)), color, thickness)
+    # Each segment is an open two point polyline, so they can all be drawn
+    # in a single call.
+    segments = np.asarray(lines).reshape(-1, 2, 2).astype(np.int32)
+    if len(segments) > 0:
+        cv2.polylines(dest_image, segments, False, color, thickness)
 
 
 def draw_points(points, dest_image, color=(0, 255, 0), size=1):
@@ -20,12 +25,15 @@ def draw_points(points, dest_image, color=(0, 255, 0), size=1):
 
 
 def draw_line_groups(line_groups, dest_image, color_options=DRAW_PALETTE):
+    color_to_lines = {}
     for i, lines in enumerate(line_groups):
-        if i > len(color_options):
+        if i >= len(color_options):
             print("Warning: There are fewer color options than groups.")
             color = (0, 0, 0)
         else:
-            color = DRAW_PALETTE[i]
+            color = color_options[i]
+        color_to_lines.setdefault(color, []).extend(lines)
+    for color, lines in color_to_lines.items():
         draw_lines(lines, dest_image, color=color)
 
 
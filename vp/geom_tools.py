@@ -1,10 +1,15 @@
-import itertools
 import math
 
 import numpy as np
 
 from vp import clusterer
 
+# Maximum number of line pairs intersected at once.
+MAX_INTERSECTION_BLOCK_SIZE = 2 ** 18
+# Maximum number of point-to-line distances held in memory at once when
+# grouping lines by their intersections.
+MAX_DISTANCE_BLOCK_SIZE = 2 ** 20
+
 
 def find_all_intersections(lines):
     """Finds intersection points, if any, between all pairs of lines.
@@ -15,12 +20,63 @@ def find_all_intersections(lines):
     Returns:
         List of (x, y) intersection points. These are not unique.
     """
-    intersection_points = []
-    for line_a, line_b in itertools.combinations(lines, 2):
-        point = find_intersection(line_a, line_b)
-        if point is not None:
-            intersection_points.append(point)
-    return intersection_points
+    return [tuple(point)
+            for point in find_all_intersection_points(lines).tolist()]
+
+
+def find_all_intersection_points(lines):
+    """Finds intersection points, if any, between all pairs of lines.
+
+    This is find_all_intersections(), computed in bulk with numpy.
+
+    Args:
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2),
+            i.e. two points on the line.
+
+    Returns:
+        (M, 2) float64 array of (x, y) intersection points. These are not unique.
+    """
+    return np.concatenate(
+        [np.empty((0, 2))] + list(iter_intersection_points(lines)))
+
+
+def iter_intersection_points(lines):
+    """Finds intersection points between all pairs of lines, a block at a time.
+
+    This lets callers consume the O(N^2) intersections without holding all
+    of them in memory at once.
+
+    Args:
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2),
+            i.e. two points on the line.
+
+    Yields:
+        (M, 2) float64 arrays of (x, y) intersection points. Concatenated,
+        they're the result of find_all_intersection_points(). Blocks may be
+        empty.
+    """
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    # In homogeneous coordinates, the line through two points is their cross
+    # product, and the intersection of two lines is the cross product of those.
+    ones = np.ones(len(lines))
+    homogeneous_lines = np.cross(
+        np.column_stack((lines[:, 0], lines[:, 1], ones)),
+        np.column_stack((lines[:, 2], lines[:, 3], ones)))
+    # Intersect a block of lines at a time with every later line, rather than
+    # materializing index arrays for all O(N^2) pairs up front.
+    num_lines = len(lines)
+    block_size = max(1, MAX_INTERSECTION_BLOCK_SIZE // max(num_lines, 1))
+    for block_start in range(0, num_lines, block_size):
+        block_lines = homogeneous_lines[block_start:block_start + block_size]
+        later_lines = homogeneous_lines[block_start + 1:]
+        block_points = np.cross(block_lines[:, np.newaxis], later_lines)
+        # Keep each pair once, in the same order as itertools.combinations.
+        is_later = (np.arange(len(later_lines)) >=
+                    np.arange(len(block_lines))[:, np.newaxis])
+        block_points = block_points[is_later]
+        # Parallel or duplicate lines only meet at infinity.
+        block_points = block_points[block_points[:, 2] != 0]
+        yield block_points[:, :2] / block_points[:, 2:]
 
 
 def find_intersection(line_a, line_b):
@@ -34,8 +90,8 @@ def find_intersection(line_a, line_b):
         Vector of x, y, the point of intersection. May be None for parallel
         or duplicate lines.
     """
-    ax1, ay1, ax2, ay2 = np.array(line_a, dtype=np.float64)
-    bx1, by1, bx2, by2 = np.array(line_b, dtype=np.float64)
+    ax1, ay1, ax2, ay2 = map(float, line_a)
+    bx1, by1, bx2, by2 = map(float, line_b)
     denominator = (ax1 - ax2) * (by1 - by2) - (ay1 - ay2) * (bx1 - bx2)
     if denominator == 0:
         return None
@@ -56,10 +112,14 @@ def point_to_line_dist(point, line):
     Returns:
         Float, distance.
     """
-    px, py = np.array(point, dtype=np.float64)
-    x1, y1, x2, y2 = np.array(line, dtype=np.float64)
+    px, py = map(float, point)
+    x1, y1, x2, y2 = map(float, line)
     nominator = abs((y2 - y1) * px - (x2 - x1) * py + x2 * y1 - y2 * x1)
-    return nominator / point_to_point_dist((x1, y1), (x2, y2))
+    denominator = math.hypot(x2 - x1, y2 - y1)
+    if denominator == 0:
+        # Degenerate line; match numpy's float division.
+        return math.inf if nominator else math.nan
+    return nominator / denominator
 
 
 def point_to_point_dist(point_a, point_b):
@@ -72,9 +132,9 @@ def point_to_point_dist(point_a, point_b):
     Returns:
         Float, distance.
     """
-    x1, y1 = np.array(point_a, dtype=np.float64)
-    x2, y2 = np.array(point_b, dtype=np.float64)
-    return math.sqrt((y2 - y1) ** 2 + (x2 - x1) ** 2)
+    x1, y1 = map(float, point_a)
+    x2, y2 = map(float, point_b)
+    return math.hypot(x2 - x1, y2 - y1)
 
 
 def find_nearest_point(point_a, points):
@@ -88,15 +148,16 @@ def find_nearest_point(point_a, points):
         Tuple of:
             An (x, y) point tuple.
             Its distance to point_a (float).
+        Both are None if points is empty.
     """
-    nearest_point = None
-    nearest_distance = None
-    for point in points:
-        dist = point_to_point_dist(point_a, point)
-        if nearest_point is None or dist < nearest_distance:
-            nearest_distance = dist
-            nearest_point = point
-    return nearest_point, nearest_distance
+    points = list(points)
+    if not points:
+        return None, None
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    squared_dists = ((coords[:, 0] - point_a[0]) ** 2 +
+                     (coords[:, 1] - point_a[1]) ** 2)
+    nearest_index = int(np.argmin(squared_dists))
+    return points[nearest_index], math.sqrt(squared_dists[nearest_index])
 
 
 def get_midpoint(point_a, point_b):
@@ -123,11 +184,27 @@ def get_line_angle(line):
     Returns:
         Float, angle in degrees.
     """
-    x1, y1, x2, y2 = np.array(line, dtype=np.float64)
-    radians = np.arctan2(y2 - y1, x2 - x1)
+    x1, y1, x2, y2 = map(float, line)
+    radians = math.atan2(y2 - y1, x2 - x1)
     return math.degrees(radians) % 360
 
 
+def get_line_angles(lines):
+    """Calculates the angles of many lines.
+
+    This is get_line_angle(), computed in bulk with numpy.
+
+    Args:
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2).
+
+    Returns:
+        (N,) float64 array of angles in degrees.
+    """
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    radians = np.arctan2(lines[:, 3] - lines[:, 1], lines[:, 2] - lines[:, 0])
+    return np.degrees(radians) % 360
+
+
 def get_line_slope(line):
     """Calculates the slope of a line.
 
@@ -140,7 +217,7 @@ def get_line_slope(line):
     Raises:
         ZeroDivisionError, if slope is undefined (vertical lines).
     """
-    x1, y1, x2, y2 = np.array(line, dtype=np.float64)
+    x1, y1, x2, y2 = map(float, line)
     denom = x2 - x1
     if denom == 0:
         raise ZeroDivisionError
@@ -159,6 +236,21 @@ def get_line_length(line):
     return point_to_point_dist((line[0], line[1]), (line[2], line[3]))
 
 
+def get_line_lengths(lines):
+    """Calculates the lengths of many line segments.
+
+    This is get_line_length(), computed in bulk with numpy.
+
+    Args:
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2).
+
+    Returns:
+        (N,) float64 array of line lengths.
+    """
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    return np.hypot(lines[:, 2] - lines[:, 0], lines[:, 3] - lines[:, 1])
+
+
 def find_bounding_points(points):
     """Finds the minimum points that bound the set of points.
 
@@ -167,20 +259,15 @@ def find_bounding_points(points):
     allowed.
 
     Args:
-        points: List of points.
+        points: List or (N, D) array of points.
 
     Returns:
-        Tuple of min and max bounding points tuples.
+        Tuple of min and max bounding points, as lists.
     """
-    if not points:
+    if len(points) == 0:
         return None, None
-    min_bounding_point = list(points[0])
-    max_bounding_point = list(points[0])
-    for point in points:
-        for i, coord in enumerate(point):
-            min_bounding_point[i] = min(min_bounding_point[i], coord)
-            max_bounding_point[i] = max(max_bounding_point[i], coord)
-    return min_bounding_point, max_bounding_point
+    points = np.asarray(points)
+    return points.min(axis=0).tolist(), points.max(axis=0).tolist()
 
 
 def find_point_on_rect_border(rect, angle):
@@ -250,12 +337,8 @@ def find_point_cluster_average(points):
     """
     if len(points) == 0:
         return None
-    x_sum = np.float64(0)
-    y_sum = np.float64(0)
-    for x, y in points:
-        x_sum += x
-        y_sum += y
-    return x_sum / len(points), y_sum / len(points)
+    x, y = np.mean(np.asarray(points, dtype=np.float64), axis=0)
+    return x, y
 
 
 def get_biggest_intersection(lines, intersection_threshold=3):
@@ -275,55 +358,103 @@ def get_biggest_intersection(lines, intersection_threshold=3):
         May return (None, None) if no intersections are found.
     """
 
-    intersection_to_lines = _group_lines_by_intersections(
-        list(lines), intersection_threshold=intersection_threshold)
-    if len(intersection_to_lines) == 0:
+    lines = list(lines)
+    intersection_points = _find_unique_intersection_points(lines)
+    if len(intersection_points) == 0:
         return None, None
-    intersection_point, intersection_lines = sorted(
-        intersection_to_lines.items(), key=lambda t: len(t[1]))[-1]
-    return intersection_point, intersection_lines
+    num_intersecting_lines = _count_lines_by_intersections(
+        intersection_points, lines, intersection_threshold)
+    intersection_point = intersection_points[np.argmax(num_intersecting_lines)]
+    distances = _get_point_to_line_dists(intersection_point, lines)[0]
+    intersection_lines = [
+        lines[i] for i in np.flatnonzero(distances < intersection_threshold)]
+    return tuple(intersection_point.tolist()), intersection_lines
 
 
-def _group_lines_by_intersections(lines, intersection_threshold=3):
-    """Group lines according to their intersection points, within some tolerance.
+def _find_unique_intersection_points(lines):
+    """Finds distinct intersection points between all pairs of lines.
 
     Args:
-        lines: Iterable of lines tuples in (x1, y1, x2, y2) format.
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2).
+
+    Returns:
+        (M, 2) float64 array of (x, y) intersection points, in order of
+        first occurrence.
+    """
+    intersection_points = find_all_intersection_points(lines)
+    # Coalesce points that differ only by floating point noise. Intersection
+    # thresholds are in pixels, so a thousandth of a pixel is negligible.
+    _, unique_indices = np.unique(
+        intersection_points.round(decimals=3), axis=0, return_index=True)
+    return intersection_points[np.sort(unique_indices)]
+
+
+def _count_lines_by_intersections(points, lines, intersection_threshold):
+    """Counts the lines that intersect at each point, within some tolerance.
+
+    Args:
+        points: (P, 2) array of (x, y) intersection points.
+        lines: List or (L, 4) array of lines specified as (x1, y1, x2, y2).
         intersection_threshold: Maximum distance between a line and
             an intersection point for it to be considered a member of
             that intersection.
 
     Returns:
-        Dict of intersection point to set of lines considered to intersect there.
-        A line may belong to 0-n intersection points.
+        (P,) integer array of line counts. A line may count towards 0-n
+        intersection points.
+    """
+    counts = np.empty(len(points), dtype=np.intp)
+    # There are O(L^2) intersection points, so the full distance matrix is
+    # O(L^3). Work through it in blocks of points to bound peak memory.
+    block_size = max(1, MAX_DISTANCE_BLOCK_SIZE // max(len(lines), 1))
+    for block_start in range(0, len(points), block_size):
+        block_end = block_start + block_size
+        distances = _get_point_to_line_dists(points[block_start:block_end], lines)
+        counts[block_start:block_end] = np.count_nonzero(
+            distances < intersection_threshold, axis=1)
+    return counts
+
+
+def _get_point_to_line_dists(points, lines):
+    """Finds euclidean distances between every point and every line.
+
+    This is point_to_line_dist(), computed in bulk with numpy.
+
+    Args:
+        points: List or (P, 2) array of (x, y) points.
+        lines: List or (L, 4) array of lines specified as (x1, y1, x2, y2).
+
+    Returns:
+        (P, L) float64 array of distances. Degenerate (zero length) lines
+        have non-finite distances.
     """
-    intersection_points = list(set(find_all_intersections(lines)))
-    intersection_to_lines = {}
-    for point in intersection_points:
-        intersection_to_lines[point] = []
-        for line in lines:
-            if point_to_line_dist(point, line) < intersection_threshold:
-                intersection_to_lines[point].append(line)
-    return intersection_to_lines
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    x1, y1, x2, y2 = lines.T
+    dx = x2 - x1
+    dy = y2 - y1
+    nominators = np.abs(
+        dy * points[:, 0:1] - dx * points[:, 1:2] + (x2 * y1 - y2 * x1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return nominators / np.hypot(dx, dy)
 
 
 def find_largest_intersection_cluster(lines):
     """Finds the largest cluster of nearby line intersections.
 
     Args:
-        lines: List of lines specified as (x1, y1, x2, y2), i.e. two points on the line.
+        lines: List or (N, 4) array of lines specified as (x1, y1, x2, y2),
+            i.e. two points on the line.
 
     Returns:
-        List of intersection points, i.e. (x, y) tuples.
+        (K, 2) float32 array of (x, y) intersection points, or an empty list
+        if there are no intersections.
     """
-    intersection_points = np.float32(np.asarray(find_all_intersections(lines)))
+    intersection_points = find_all_intersection_points(lines).astype(np.float32)
     if len(intersection_points) == 0:
         return []
     elif len(intersection_points) == 1:
         return intersection_points
     labels = clusterer.cluster_xmeans(intersection_points, max_clusters=10)
-    label_to_points = {}
-    for i, label in enumerate(labels):
-        label_to_points.setdefault(label, []).append(intersection_points[i])
-    point_clusters = sorted(label_to_points.values(), key=lambda points: len(points))
-    return point_clusters[-1]
+    biggest_label = np.argmax(np.bincount(labels))
+    return intersection_points[labels == biggest_label]
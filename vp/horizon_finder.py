@@ -1,5 +1,3 @@
-import math
-
 import numpy as np
 
 from vp import geom_tools
@@ -9,7 +7,7 @@ def find_horizon(vanishing_points, principal_point, vertical_vanishing_point=Non
     """Detects the horizon line.
 
     Args:
-        vanishing_points: Set of vanishing point tuples.
+        vanishing_points: Set of vanishing point tuples, or (K, 2) array.
         principal_point: Tuple, camera center on the projection.
         vertical_vanishing_point: Vertical vanishing point tuple.
             Supply if known, otherwise this will be calculated from
@@ -37,11 +35,12 @@ def find_horizon(vanishing_points, principal_point, vertical_vanishing_point=Non
             horizon_line_slope = -1 / geom_tools.get_line_slope(vertical_vp_line)
         except ZeroDivisionError:
             horizon_line_slope = 0
-        horizontal_vps = set(vanishing_points).difference({vertical_vanishing_point})
+        horizontal_vps = set(map(tuple, vanishing_points)).difference(
+            {tuple(vertical_vanishing_point)})
     else:
         # If we can't find a vertical vanishing point, assume a flat horizon line.
         horizon_line_slope = 0
-        horizontal_vps = set(vanishing_points)
+        horizontal_vps = set(map(tuple, vanishing_points))
 
     if not horizontal_vps:
         # If we only found a vertical VP, used the predicted slope and
@@ -61,23 +60,26 @@ def choose_vertical_vanishing_point(vanishing_points, principal_point):
     and returns the most distant of them.
 
     Args:
-        vanishing_points: Set of vanishing points.
+        vanishing_points: Set of vanishing points, or (K, 2) array.
         principal_point: Tuple, camera center on the projection.
 
     Returns:
         Point tuple, or None if detection fails.
     """
     best_vertical_vp = None
-    best_vertical_vp_mag = None
+    best_vertical_vp_mag_squared = None
+    # Magnitudes are compared squared, to avoid square roots.
+    min_mag_squared = max(principal_point[1] * 2, 0) ** 2
     for vp in vanishing_points:
         vx, vy = (vp[0] - principal_point[0], vp[1] - principal_point[1])
-        angle = math.degrees(math.atan2(vy, vx))
-        if 45 <= angle <= 135 or -135 <= angle <= -45:
-            magnitude = math.hypot(vx, vy)
-            if magnitude > principal_point[1] * 2 and (
-                    best_vertical_vp is None or magnitude > best_vertical_vp_mag):
+        # Vertical means within 45 degrees of straight up or down.
+        if abs(vy) >= abs(vx):
+            mag_squared = vx * vx + vy * vy
+            if mag_squared > min_mag_squared and (
+                    best_vertical_vp is None or
+                    mag_squared > best_vertical_vp_mag_squared):
                 best_vertical_vp = vp
-                best_vertical_vp_mag = magnitude
+                best_vertical_vp_mag_squared = mag_squared
     return best_vertical_vp
 
 
@@ -85,15 +87,20 @@ def _find_best_intercept(points, slope):
     """Fits an intercept to points given a fixed slope.
 
     Args:
-        points: List of point tuples.
+        points: Iterable of point tuples.
         slope: Float, line slope value.
 
     Returns:
         Float, intercept value.
+
+    Raises:
+        ValueError, if there are no points.
     """
     # TODO: Use a weighted least squares fit, where the weight of each
     # detected horizontal vanishing point equals the number of corresponding
     # lines, OR the trace of covariance.
-    coeffs = np.vstack(np.ones(len(points)))
-    ys = np.array([y - slope * x for (x, y) in points], dtype=np.float64)
-    return np.linalg.lstsq(coeffs, ys, rcond=None)[0][0]
+    points = np.array(list(points), dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        raise ValueError('Cannot fit an intercept to no points.')
+    # With the slope fixed, the least squares intercept is just the mean.
+    return float(np.mean(points[:, 1] - slope * points[:, 0]))
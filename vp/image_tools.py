@@ -29,7 +29,7 @@ def border_image_to_accommodate_points(
 
     Args:
         image: OpenCV image.
-        points: List of data points.
+        points: List or (N, 2) array of data points.
         color: Color tuple for the border.
         max_border_size: Optional limit on the max pixel size of the border.
 
@@ -42,7 +42,7 @@ def border_image_to_accommodate_points(
                 image must apply this translation to maintain their position relative
                 to the image.
     """
-    if not points:
+    if len(points) == 0:
         return image, points, None
     image_height, image_width = image.shape[:2]
     left_border, top_border = _calculate_border_size(
@@ -66,13 +66,14 @@ def _calculate_border_size(image_width, image_height, points, max_border_size=No
         Tuple of left/right border size, top/bottom border size.
         Size of one side of the border (e.g. top, not top + bottom).
     """
-    if not points:
+    if len(points) == 0:
         return 0, 0
-    min_bounds, max_bounds = geom_tools.find_bounding_points(
-        points + [(0, 0), (image_width, image_height)])
+    min_bounds, max_bounds = geom_tools.find_bounding_points(points)
 
-    desired_width = max_bounds[0] - min_bounds[0]
-    desired_height = max_bounds[1] - min_bounds[1]
+    # The bounds must also contain the image itself, at (0, 0) to
+    # (image_width, image_height).
+    desired_width = max(max_bounds[0], image_width) - min(min_bounds[0], 0)
+    desired_height = max(max_bounds[1], image_height) - min(min_bounds[1], 0)
 
     width_adjustment = max(desired_width - image_width, 0)
     height_adjustment = max(desired_height - image_height, 0)
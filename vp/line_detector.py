@@ -1,10 +1,15 @@
 import math
+import threading
 
 import cv2
 import numpy as np
 
 from vp import geom_tools
 
+# LSD detectors are reused across calls, but aren't thread-safe,
+# so each thread gets its own.
+_lsd_detectors = threading.local()
+
 
 def enhance_edges(image):
     """Pre-processing step to enhance edges.
@@ -15,11 +20,11 @@ def enhance_edges(image):
     Returns:
         Image, filtered for edge detection.
     """
-    working_image = image.copy()
-    working_image = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
+    # cvtColor allocates a new image, so the source is left untouched, and
+    # the blur can safely run in place.
+    working_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     # Blur away fine details.
-    working_image = cv2.GaussianBlur(working_image, (5, 5), 0)
-    return working_image
+    return cv2.GaussianBlur(working_image, (5, 5), 0, dst=working_image)
 
 
 def lsd_lines(source_image, min_line_length=0.0375, max_line_length=1, min_precision=0):
@@ -34,19 +39,32 @@ def lsd_lines(source_image, min_line_length=0.0375, max_line_length=1, min_preci
         min_precision: Minimum precision of detections.
 
     Returns:
-        Array of line endpoints tuples (x1, y1, x2, y2).
+        (N, 4) float32 array of line endpoints, one (x1, y1, x2, y2) row per line.
     """
     height, width = source_image.shape[:2]
     diagonal = math.sqrt(height ** 2 + width ** 2)
     min_line_length = min_line_length * diagonal
     max_line_length = max_line_length * diagonal
 
-    detector = cv2.createLineSegmentDetector(cv2.LSD_REFINE_ADV)
+    detector = _get_lsd_detector()
     lines, rect_widths, precisions, false_alarms = detector.detect(source_image)
-    line_lengths = [geom_tools.get_line_length(l[0]) for l in lines]
-    return [l[0] for (i, l) in enumerate(lines)
-            if max_line_length > line_lengths[i] > min_line_length and
-            precisions[i] > min_precision]
+    if lines is None:
+        return np.empty((0, 4), dtype=np.float32)
+    lines = lines.reshape(-1, 4)
+    line_lengths = geom_tools.get_line_lengths(lines)
+    keep = ((line_lengths > min_line_length) &
+            (line_lengths < max_line_length) &
+            (precisions.ravel() > min_precision))
+    return lines[keep]
+
+
+def _get_lsd_detector():
+    """Gets the calling thread's LSD detector, creating it on first use."""
+    detector = getattr(_lsd_detectors, 'detector', None)
+    if detector is None:
+        detector = cv2.createLineSegmentDetector(cv2.LSD_REFINE_ADV)
+        _lsd_detectors.detector = detector
+    return detector
 
 
 def hough_lines(source_image, min_points=0.075, min_line_length=0.2, max_line_gap=0.2):
@@ -61,7 +79,7 @@ def hough_lines(source_image, min_points=0.075, min_line_length=0.2, max_line_ga
         max_line_gap: Maximum gap between segments of the same line. Specified as
             a percentage of the source image diagonal (0-1).
     Returns:
-        Array of line endpoints tuples (x1, y1, x2, y2).
+        (N, 4) float32 array of line endpoints, one (x1, y1, x2, y2) row per line.
     """
     height, width = source_image.shape[:2]
     size = math.sqrt(height ** 2 + width ** 2)
@@ -72,7 +90,9 @@ def hough_lines(source_image, min_points=0.075, min_line_length=0.2, max_line_ga
         math.ceil(min_points * size),
         minLineLength=math.ceil(min_line_length * size),
         maxLineGap=math.ceil(max_line_gap * size))
-    return [l[0] for l in lines] if lines is not None else []
+    if lines is None:
+        return np.empty((0, 4), dtype=np.float32)
+    return lines.reshape(-1, 4).astype(np.float32)
 
 
 def canny_edges(image, thresholding_sigma=0.33):
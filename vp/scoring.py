@@ -1,6 +1,6 @@
 import math
 
-from vp import geom_tools
+import numpy as np
 
 
 def horizon_error(ground_truth_horizon, detected_horizon, image_dims):
@@ -31,6 +31,40 @@ def horizon_error(ground_truth_horizon, detected_horizon, image_dims):
     return max(abs(gt(0) - dt(0)), abs(gt(width) - dt(width))) / height
 
 
+def horizon_error_batch(ground_truth_horizons, detected_horizons, image_dims):
+    """Calculates horizon_error() for many images at once.
+
+    Args:
+        ground_truth_horizons: List of (slope, intercept) tuples for the GT
+            horizon lines. Entries may be None.
+        detected_horizons: List of (slope, intercept) tuples for the detected
+            horizon lines, in corresponding order. Entries may be None.
+        image_dims: Tuple of integers, (width, height) of the images, in pixels.
+
+    Returns:
+        List of floats, with None where a horizon is missing altogether.
+    """
+    missing = [gt is None or dt is None
+               for gt, dt in zip(ground_truth_horizons, detected_horizons)]
+    gt_horizons = _horizons_to_array(ground_truth_horizons)
+    dt_horizons = _horizons_to_array(detected_horizons)
+    width, height = image_dims
+    # Heights of each line at both x-axis edges of the image.
+    edges = np.array([0, width], dtype=np.float64)
+    gt_ys = gt_horizons[:, :1] * edges + gt_horizons[:, 1:]
+    dt_ys = dt_horizons[:, :1] * edges + dt_horizons[:, 1:]
+    errors = np.abs(gt_ys - dt_ys).max(axis=1) / height
+    return [None if is_missing else float(error)
+            for is_missing, error in zip(missing, errors)]
+
+
+def _horizons_to_array(horizons):
+    """Stacks (slope, intercept) tuples into an (N, 2) array, with NaN for None."""
+    return np.array(
+        [h if h is not None else (np.nan, np.nan) for h in horizons],
+        dtype=np.float64).reshape(-1, 2)
+
+
 def vp_direction_error(ground_truth_vps, detected_vps, image_dims):
     """Measures error in direction from center of detected vanishing points.
 
@@ -38,7 +72,7 @@ def vp_direction_error(ground_truth_vps, detected_vps, image_dims):
 
     Args:
         ground_truth_vps: List of ground truth VP point tuples.
-        detected_vps: List of detected VP point tuples.
+        detected_vps: List of detected VP point tuples, or (K, 2) array.
         image_dims: Tuple of integers, (width, height) of the image, in pixels.
 
     Returns:
@@ -46,27 +80,16 @@ def vp_direction_error(ground_truth_vps, detected_vps, image_dims):
         Error is None for missing VPs.
     """
     principal_point = (image_dims[0] // 2, image_dims[1] // 2)
-    point_pair_dists = []
-    for gt_vp in ground_truth_vps:
-        for dt_vp in detected_vps:
-            gt_angle = geom_tools.get_line_angle((
-                principal_point[0], principal_point[1], gt_vp[0], gt_vp[1]))
-            dt_angle = geom_tools.get_line_angle((
-                principal_point[0], principal_point[1], dt_vp[0], dt_vp[1]))
-            angle_diff = 180 - abs(abs(gt_angle - dt_angle) - 180)
-            point_pair_dists.append((angle_diff, gt_vp, dt_vp))
-
-    point_pair_dists = sorted(point_pair_dists, key=lambda k: k[0])
-
-    gt_vp_to_error = {}
-    seen_dt_vps = set()
-    for distance, gt_vp, dt_vp in point_pair_dists:
-        if gt_vp in gt_vp_to_error or dt_vp in seen_dt_vps:
-            continue
-        gt_vp_to_error[gt_vp] = distance
-        seen_dt_vps.add(dt_vp)
+    gt_angles = _get_angles_from_point(principal_point, ground_truth_vps)
+    dt_angles = _get_angles_from_point(principal_point, detected_vps)
+    angle_diffs = 180 - np.abs(
+        np.abs(gt_angles[:, np.newaxis] - dt_angles) - 180)
 
-    return [gt_vp_to_error.get(gt, None) for gt in ground_truth_vps]
+    gt_vp_errors = [None] * len(ground_truth_vps)
+    for angle_diff, gt_index, _ in _match_greedily(angle_diffs):
+        gt_vp_errors[gt_index] = angle_diff
+
+    return gt_vp_errors
 
 
 def location_accuracy_error(ground_truth_vps, detected_vps):
@@ -77,7 +100,7 @@ def location_accuracy_error(ground_truth_vps, detected_vps):
 
     Args:
         ground_truth_vps: List of ground truth VP point tuples.
-        detected_vps: List of detected VP point tuples.
+        detected_vps: List of detected VP point tuples, or (K, 2) array.
 
     Returns:
         Float, error.
@@ -85,28 +108,58 @@ def location_accuracy_error(ground_truth_vps, detected_vps):
     if len(ground_truth_vps) == 0 or len(detected_vps) == 0:
         return 0
 
-    point_pair_dists = []
-    for gt_vp in ground_truth_vps:
-        for dt_vp in detected_vps:
-            distance = geom_tools.point_to_point_dist(gt_vp, dt_vp)
-            point_pair_dists.append((distance, gt_vp, dt_vp))
-
-    sorted(point_pair_dists, key=lambda k: k[0])
+    gt_vps = _vps_to_array(ground_truth_vps)
+    dt_vps = _vps_to_array(detected_vps)
+    dists = np.hypot(
+        gt_vps[:, np.newaxis, 0] - dt_vps[:, 0],
+        gt_vps[:, np.newaxis, 1] - dt_vps[:, 1])
 
-    seen_gt_vps = set()
-    seen_dt_vps = set()
     total_error = 0
-    for distance, gt_vp, dt_vp in point_pair_dists:
-        if gt_vp in seen_gt_vps or dt_vp in seen_dt_vps:
-            continue
-        seen_gt_vps.add(gt_vp)
-        seen_dt_vps.add(dt_vp)
+    for distance, _, _ in _match_greedily(dists):
         if distance > 0:
             total_error += math.log(distance)
 
     return total_error / min(len(detected_vps), len(ground_truth_vps))
 
 
+def _vps_to_array(vps):
+    """Stacks VP point tuples into an (N, 2) float64 array."""
+    return np.asarray(vps, dtype=np.float64).reshape(-1, 2)
+
+
+def _get_angles_from_point(point, vps):
+    """Finds the angle in degrees of the line from a point to each VP."""
+    offsets = _vps_to_array(vps) - point
+    return np.degrees(np.arctan2(offsets[:, 1], offsets[:, 0])) % 360
+
+
+def _match_greedily(costs):
+    """Matches ground truth and detected VPs, cheapest pairs first.
+
+    Each VP is matched at most once. Ties are broken by ground truth index,
+    then detected index.
+
+    Args:
+        costs: (G, D) array of the cost of matching each ground truth VP
+            with each detected VP.
+
+    Returns:
+        List of (float cost, ground truth index, detected index) tuples,
+        in increasing order of cost.
+    """
+    matches = []
+    seen_gt_vps = set()
+    seen_dt_vps = set()
+    for flat_index in np.argsort(costs, axis=None, kind='stable'):
+        gt_index, dt_index = divmod(int(flat_index), costs.shape[1])
+        if gt_index in seen_gt_vps or dt_index in seen_dt_vps:
+            continue
+        seen_gt_vps.add(gt_index)
+        seen_dt_vps.add(dt_index)
+        matches.append((float(costs[gt_index, dt_index]), gt_index, dt_index))
+    return matches
+
+
 def num_model_detection_error(ground_truth_vps, detected_vps):
     """Measures error in the number of detected vanishing points.
 
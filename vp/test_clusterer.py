@@ -0,0 +1,116 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from vp import clusterer
+
+
+class TestClusterAndScore(unittest.TestCase):
+
+    def setUp(self):
+        clusterer.clear_kmeans_cache()
+        self.data_points = np.array(
+            [[0], [1], [2], [100], [101], [102]], dtype=np.float32)
+        self.data_key = clusterer._get_cache_key(self.data_points)
+
+    def tearDown(self):
+        clusterer.clear_kmeans_cache()
+
+    def test_cache_hit_is_independent(self):
+        labels, centers, score = clusterer._cluster_and_score(
+            self.data_points, 2, self.data_key)
+        expected_labels = labels.copy()
+        expected_centers = centers.copy()
+        labels[:] = -1
+        centers[:] = -1
+        hit_labels, hit_centers, hit_score = clusterer._cluster_and_score(
+            self.data_points, 2, self.data_key)
+        np.testing.assert_array_equal(hit_labels, expected_labels)
+        np.testing.assert_array_equal(hit_centers, expected_centers)
+        self.assertEqual(hit_score, score)
+
+        hit_labels[:] = -1
+        np.testing.assert_array_equal(
+            clusterer._cluster_and_score(
+                self.data_points, 2, self.data_key)[0],
+            expected_labels)
+
+
+class TestGetCacheKey(unittest.TestCase):
+
+    def test_same_contents(self):
+        data_points = np.arange(10, dtype=np.float32).reshape(-1, 1)
+        self.assertEqual(
+            clusterer._get_cache_key(data_points),
+            clusterer._get_cache_key(data_points.copy()))
+
+    def test_different_contents(self):
+        data_points = np.arange(10, dtype=np.float32).reshape(-1, 1)
+        self.assertNotEqual(
+            clusterer._get_cache_key(data_points),
+            clusterer._get_cache_key(data_points + 1))
+        self.assertNotEqual(
+            clusterer._get_cache_key(data_points),
+            clusterer._get_cache_key(data_points.reshape(-1, 2)))
+        self.assertNotEqual(
+            clusterer._get_cache_key(data_points),
+            clusterer._get_cache_key(data_points.astype(np.float64)))
+
+    def test_size_independent_of_data(self):
+        small_key = clusterer._get_cache_key(np.zeros((10, 1)))
+        large_key = clusterer._get_cache_key(np.zeros((100000, 1)))
+        self.assertEqual(len(small_key[2]), len(large_key[2]))
+
+    def test_non_contiguous(self):
+        data_points = np.arange(20, dtype=np.float32).reshape(-1, 2)
+        self.assertEqual(
+            clusterer._get_cache_key(data_points[:, :1]),
+            clusterer._get_cache_key(data_points[:, :1].copy()))
+
+
+class TestClusterXmeans(unittest.TestCase):
+
+    def setUp(self):
+        self.data_points = np.zeros((10, 1), dtype=np.float32)
+
+    def cluster_with_scores(self, scores, **kwargs):
+        """Runs cluster_xmeans with a fixed score per number of clusters.
+
+        Labels are the number of clusters, to tell the clusterings apart.
+
+        Returns:
+            Tuple of the returned labels, list of numbers of clusters tried.
+        """
+        tried = []
+
+        def cluster_and_score(data_points, num_clusters, data_key):
+            tried.append(num_clusters)
+            return (np.full(len(data_points), num_clusters), None,
+                    scores[num_clusters])
+
+        with mock.patch.object(
+                clusterer, '_cluster_and_score', cluster_and_score):
+            labels = clusterer.cluster_xmeans(self.data_points, **kwargs)
+        return labels, tried
+
+    def test_one_regression_continues(self):
+        labels, tried = self.cluster_with_scores(
+            {1: 10, 2: 12, 3: 5, 4: 6, 5: 7, 6: 1})
+        self.assertEqual(tried, [1, 2, 3, 4, 5])
+        np.testing.assert_array_equal(labels, np.full(10, 3))
+
+    def test_patience_regressions_stop(self):
+        labels, tried = self.cluster_with_scores(
+            {1: 10, 2: 12, 3: 13, 4: 1}, patience=2)
+        self.assertEqual(tried, [1, 2, 3])
+        np.testing.assert_array_equal(labels, np.full(10, 1))
+
+        labels, tried = self.cluster_with_scores(
+            {1: 10, 2: 12, 3: 1}, patience=1)
+        self.assertEqual(tried, [1, 2])
+        np.testing.assert_array_equal(labels, np.full(10, 1))
+
+    def test_returns_best_not_last(self):
+        labels, _ = self.cluster_with_scores({1: 10, 2: 4, 3: 5, 4: 6})
+        np.testing.assert_array_equal(labels, np.full(10, 2))
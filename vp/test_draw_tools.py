@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from vp import draw_tools
+
+
+class TestDrawLineGroups(unittest.TestCase):
+
+    def setUp(self):
+        self.image = np.full((100, 100, 3), 255, dtype=np.uint8)
+        # One horizontal line per group, at y = 10, 30, 50, ...
+        self.line_groups = [[(10, y, 90, y)] for y in (10, 30, 50)]
+
+    def get_line_color(self, group_index):
+        return tuple(self.image[10 + 20 * group_index, 50])
+
+    def test_color_options(self):
+        color_options = [(0, 0, 255), (0, 255, 0), (255, 0, 0)]
+        draw_tools.draw_line_groups(
+            self.line_groups, self.image, color_options=color_options)
+        for i, color in enumerate(color_options):
+            self.assertEqual(self.get_line_color(i), color)
+
+    def test_default_palette(self):
+        draw_tools.draw_line_groups(self.line_groups, self.image)
+        for i in range(len(self.line_groups)):
+            self.assertEqual(
+                self.get_line_color(i), draw_tools.DRAW_PALETTE[i])
+
+    def test_fewer_colors_than_groups(self):
+        color_options = [(0, 0, 255), (0, 255, 0)]
+        with mock.patch('builtins.print'):
+            draw_tools.draw_line_groups(
+                self.line_groups, self.image, color_options=color_options)
+        self.assertEqual(self.get_line_color(0), (0, 0, 255))
+        self.assertEqual(self.get_line_color(1), (0, 255, 0))
+        self.assertEqual(self.get_line_color(2), (0, 0, 0))
+
+    def test_shared_color(self):
+        color_options = [(0, 0, 255), (0, 0, 255), (0, 255, 0)]
+        line_groups = [np.array(lines) for lines in self.line_groups]
+        draw_tools.draw_line_groups(
+            line_groups, self.image, color_options=color_options)
+        self.assertEqual(self.get_line_color(0), (0, 0, 255))
+        self.assertEqual(self.get_line_color(1), (0, 0, 255))
+        self.assertEqual(self.get_line_color(2), (0, 255, 0))
+
+    def test_no_groups(self):
+        draw_tools.draw_line_groups([], self.image)
+        draw_tools.draw_line_groups([[]], self.image)
+        self.assertTrue(np.all(self.image == 255))
@@ -1,3 +1,5 @@
+import itertools
+import math
 import unittest
 
 import numpy as np
@@ -47,6 +49,54 @@ class TestFindAllIntersections(unittest.TestCase):
             [])
 
 
+class TestFindAllIntersectionPoints(unittest.TestCase):
+
+    def test_happy(self):
+        intersections = geom_tools.find_all_intersection_points(
+            [(0, 0, 1, 1), (0, 10, 10, 0), (0, 2, 1, 3)])
+        np.testing.assert_array_equal(intersections, [(5, 5), (4, 6)])
+
+    def test_matches_pairwise(self):
+        lines = [(80, 159, 403, 346), (63, 80, 390, 276), (0, 0, 1, 1),
+                 (2, 2, 3, 3), (10, 0, 10, 100)]
+        expected = [
+            geom_tools.find_intersection(line_a, line_b)
+            for line_a, line_b in itertools.combinations(lines, 2)]
+        np.testing.assert_allclose(
+            geom_tools.find_all_intersection_points(lines),
+            [point for point in expected if point is not None])
+
+    def test_no_lines(self):
+        self.assertEqual(
+            geom_tools.find_all_intersection_points([]).shape, (0, 2))
+
+    def test_no_intersections(self):
+        self.assertEqual(
+            geom_tools.find_all_intersection_points(
+                [(0, 0, 1, 1), (0, 2, 1, 3)]).shape,
+            (0, 2))
+
+
+class TestIterIntersectionPoints(unittest.TestCase):
+
+    def test_blocks_match_all(self):
+        lines = [(80, 159, 403, 346), (63, 80, 390, 276), (0, 0, 1, 1),
+                 (2, 2, 3, 3), (10, 0, 10, 100)]
+        block_size = geom_tools.MAX_INTERSECTION_BLOCK_SIZE
+        geom_tools.MAX_INTERSECTION_BLOCK_SIZE = 10
+        try:
+            blocks = list(geom_tools.iter_intersection_points(lines))
+        finally:
+            geom_tools.MAX_INTERSECTION_BLOCK_SIZE = block_size
+        self.assertGreater(len(blocks), 1)
+        np.testing.assert_array_equal(
+            np.concatenate(blocks),
+            geom_tools.find_all_intersection_points(lines))
+
+    def test_no_lines(self):
+        self.assertEqual(list(geom_tools.iter_intersection_points([])), [])
+
+
 class TestPointToLineDistance(unittest.TestCase):
 
     def test_happy(self):
@@ -75,6 +125,24 @@ class TestPointToPointDistance(unittest.TestCase):
         self.assertEqual(geom_tools.point_to_point_dist((1, 1), (1, 1)), 0)
 
 
+class TestFindNearestPoint(unittest.TestCase):
+
+    def test_happy(self):
+        point, distance = geom_tools.find_nearest_point(
+            (0, 0), [(3, 4), (-1, 1), (5, 5)])
+        self.assertEqual(point, (-1, 1))
+        self.assertAlmostEqual(distance, math.sqrt(2))
+
+    def test_tie(self):
+        point, distance = geom_tools.find_nearest_point(
+            (0, 0), [(0, 1), (1, 0)])
+        self.assertEqual(point, (0, 1))
+        self.assertEqual(distance, 1)
+
+    def test_no_points(self):
+        self.assertEqual(geom_tools.find_nearest_point((0, 0), []), (None, None))
+
+
 class TestGetMidpoint(unittest.TestCase):
 
     def test_happy(self):
@@ -141,6 +209,19 @@ class TestGetLineAngle(unittest.TestCase):
             225)
 
 
+class TestGetLineAngles(unittest.TestCase):
+
+    def test_matches_get_line_angle(self):
+        lines = [(0, 0, 0, 1), (0, 0, 0, -1), (0, 0, -1, 0), (1, 1, 10, 10),
+                 (0, 0, -1, -1), (80, 159, 403, 346)]
+        np.testing.assert_allclose(
+            geom_tools.get_line_angles(lines),
+            [geom_tools.get_line_angle(line) for line in lines])
+
+    def test_no_lines(self):
+        self.assertEqual(geom_tools.get_line_angles([]).shape, (0,))
+
+
 class TestGetLineSlope(unittest.TestCase):
 
     def test_happy(self):
@@ -167,6 +248,18 @@ class TestGetLineSlope(unittest.TestCase):
             0)
 
 
+class TestGetLineLengths(unittest.TestCase):
+
+    def test_happy(self):
+        np.testing.assert_allclose(
+            geom_tools.get_line_lengths(
+                [(0, 0, 3, 4), (1, 1, 1, 1), (-1, -1, -4, -5)]),
+            [5, 0, 5])
+
+    def test_no_lines(self):
+        self.assertEqual(geom_tools.get_line_lengths([]).shape, (0,))
+
+
 class TestFindBoundingPoints(unittest.TestCase):
 
     def test_no_points(self):
@@ -261,6 +354,31 @@ class TestFindPointClusterAverage(unittest.TestCase):
             None)
 
 
+class TestGetBiggestIntersection(unittest.TestCase):
+
+    def test_happy(self):
+        lines = [(0, 0, 1, 1), (0, 10, 10, 0), (5, 0, 5, 1), (0, 20, 1, 21)]
+        point, intersection_lines = geom_tools.get_biggest_intersection(lines)
+        self.assertEqual(point, (5, 5))
+        self.assertEqual(
+            sorted(intersection_lines),
+            [(0, 0, 1, 1), (0, 10, 10, 0), (5, 0, 5, 1)])
+
+    def test_threshold(self):
+        lines = [(0, 0, 1, 1), (0, 10, 10, 0), (6, 0, 6, 1)]
+        _, intersection_lines = geom_tools.get_biggest_intersection(
+            lines, intersection_threshold=1)
+        self.assertEqual(len(intersection_lines), 2)
+        _, intersection_lines = geom_tools.get_biggest_intersection(
+            lines, intersection_threshold=2)
+        self.assertEqual(len(intersection_lines), 3)
+
+    def test_no_intersections(self):
+        self.assertEqual(
+            geom_tools.get_biggest_intersection([(0, 0, 1, 1), (0, 2, 1, 3)]),
+            (None, None))
+
+
 class TestFindLargestIntersectionCluster(unittest.TestCase):
 
     def test_no_lines(self):
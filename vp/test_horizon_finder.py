@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from vp import horizon_finder
 
 
@@ -22,6 +24,14 @@ class TestFindHorizon(unittest.TestCase):
     def test_no_vps(self):
         self.assertEqual(
             horizon_finder.find_horizon(set([]), (0, 0)), (0, 0))
+        self.assertEqual(
+            horizon_finder.find_horizon(np.empty((0, 2)), (0, 0)), (0, 0))
+
+    def test_array_vps(self):
+        slope, intercept = horizon_finder.find_horizon(
+            np.array([(0, 10), (10, 10), (0, 100)]), (0, 0))
+        self.assertAlmostEqual(slope, 0)
+        self.assertAlmostEqual(intercept, 10)
 
     def test_no_vertical_vp(self):
         self.assertEqual(
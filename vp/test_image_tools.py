@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from vp import image_tools
 
 
@@ -52,3 +54,39 @@ class TestCalculateBorderSize(unittest.TestCase):
             image_tools._calculate_border_size(
                 100, 100, [(-100, 300)]),
             (50, 100))
+
+    def test_array_points(self):
+        self.assertEqual(
+            image_tools._calculate_border_size(
+                100, 100, np.array([(-100, -100), (200, 200)])),
+            (100, 100))
+
+
+class TestBorderImageToAccommodatePoints(unittest.TestCase):
+
+    def setUp(self):
+        self.image = np.zeros((100, 100, 3), dtype=np.uint8)
+
+    def test_happy(self):
+        new_image, shifted_points, shift = (
+            image_tools.border_image_to_accommodate_points(
+                self.image, [(-100, 50), (50, 150)]))
+        self.assertEqual(new_image.shape, (150, 200, 3))
+        self.assertEqual(shifted_points, [(-50, 75), (100, 175)])
+        self.assertEqual(shift, (50, 25))
+
+    def test_array_points(self):
+        new_image, shifted_points, shift = (
+            image_tools.border_image_to_accommodate_points(
+                self.image, np.array([(-100, 50), (50, 150)])))
+        self.assertEqual(new_image.shape, (150, 200, 3))
+        self.assertEqual(shifted_points, [(-50, 75), (100, 175)])
+        self.assertEqual(shift, (50, 25))
+
+    def test_no_points(self):
+        for points in ([], np.empty((0, 2))):
+            new_image, shifted_points, shift = (
+                image_tools.border_image_to_accommodate_points(
+                    self.image, points))
+            self.assertIs(new_image, self.image)
+            self.assertIsNone(shift)
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from vp import scoring
 
 
@@ -40,6 +42,26 @@ class TestHorizonError(unittest.TestCase):
             2)
 
 
+class TestHorizonErrorBatch(unittest.TestCase):
+
+    def test_matches_single(self):
+        gt_horizons = [(1, 1), (1, 0), (-1, 100), (1, 0), (0.5, 3.25)]
+        dt_horizons = [(1, 1), (2, 0), (2, 0), (1, 500), (-0.25, 10)]
+        self.assertEqual(
+            scoring.horizon_error_batch(gt_horizons, dt_horizons, (100, 50)),
+            [scoring.horizon_error(gt, dt, (100, 50))
+             for gt, dt in zip(gt_horizons, dt_horizons)])
+
+    def test_missing_horizons(self):
+        self.assertEqual(
+            scoring.horizon_error_batch(
+                [None, (1, 0), (1, 0)], [(1, 0), None, (2, 0)], (100, 100)),
+            [None, None, 1])
+
+    def test_no_horizons(self):
+        self.assertEqual(scoring.horizon_error_batch([], [], (100, 100)), [])
+
+
 class TestVPDirectionError(unittest.TestCase):
 
     def test_same_vps(self):
@@ -86,6 +108,12 @@ class TestVPDirectionError(unittest.TestCase):
         self.assertEqual(round(first, 2), 26.57)
         self.assertEqual(second, 0)
 
+    def test_array_vps(self):
+        self.assertEqual(
+            scoring.vp_direction_error(
+                [(1, 1), (-2, -2)], np.array([(1, 1), (-2, -2)]), (200, 200)),
+            [0, 0])
+
 
 class TestLocationAccuracyError(unittest.TestCase):
 
@@ -110,18 +138,25 @@ class TestLocationAccuracyError(unittest.TestCase):
             round(scoring.location_accuracy_error(
                 ground_truth_vps,
                 [(10, 0)]), 1),
-            2.3)
+            2.1)
         self.assertEqual(
             round(scoring.location_accuracy_error(
                 ground_truth_vps,
                 [(10, 0), (11, 1)]), 1),
-            2.3)
+            2.2)
         self.assertEqual(
             round(scoring.location_accuracy_error(
                 ground_truth_vps,
                 [(1000, 0)]), 1),
             6.9)
 
+    def test_array_vps(self):
+        self.assertEqual(
+            round(scoring.location_accuracy_error(
+                [(0, 0), (1, 1), (2, 2)],
+                np.array([(10, 0)])), 1),
+            2.1)
+
 
 class TestNumModelDetectionError(unittest.TestCase):
 
@@ -0,0 +1,79 @@
+import collections
+import unittest
+
+import numpy as np
+
+from vp import vp_finder
+
+_ModelResult = collections.namedtuple('_ModelResult', ['fit', 'inliers'])
+
+
+class _RunResults(object):
+    """Stands in for the results of a RANSAC run."""
+
+    def __init__(self, model_results, global_outliers):
+        self.model_results = model_results
+        self.global_outliers = global_outliers
+
+    def get_model_results(self):
+        return self.model_results
+
+    def get_global_outliers(self):
+        return self.global_outliers
+
+
+class TestVPResult(unittest.TestCase):
+
+    def setUp(self):
+        self.line_groups = [[(0, 0, 1, 1)], [(0, 10, 10, 0), (0, 9, 9, 0)]]
+        self.outlier_lines = [(5, 5, 6, 5)]
+        self.result = vp_finder.VPResult(
+            np.array([(5, 5), (100, -20.5)]), self.line_groups,
+            self.outlier_lines)
+
+    def test_fields(self):
+        self.assertEqual(
+            vp_finder.VPResult._fields,
+            ('vps', 'line_groups', 'outlier_lines'))
+        vps, line_groups, outlier_lines = self.result
+        np.testing.assert_array_equal(vps, self.result.vps)
+        self.assertIs(line_groups, self.line_groups)
+        self.assertIs(outlier_lines, self.outlier_lines)
+
+    def test_to_dict(self):
+        vp_to_lines = self.result.to_dict()
+        self.assertEqual(
+            vp_to_lines,
+            {(5.0, 5.0): self.line_groups[0],
+             (100.0, -20.5): self.line_groups[1]})
+        for vp in vp_to_lines:
+            self.assertIsInstance(vp[0], float)
+
+    def test_to_dict_empty(self):
+        self.assertEqual(
+            vp_finder.VPResult(np.empty((0, 2)), [], []).to_dict(), {})
+
+
+class TestToVPResult(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = np.array(
+            [(0, 0, 1, 1), (0, 10, 10, 0), (5, 5, 6, 5)], dtype=np.float32)
+
+    def test_happy(self):
+        result = vp_finder._to_vp_result(
+            _RunResults(
+                [_ModelResult((5, 5), self.lines[:2])], self.lines[2:]),
+            self.lines)
+        self.assertEqual(result.vps.shape, (1, 2))
+        self.assertEqual(result.vps.dtype, np.float64)
+        np.testing.assert_array_equal(result.vps, [(5, 5)])
+        np.testing.assert_array_equal(result.line_groups[0], self.lines[:2])
+        np.testing.assert_array_equal(result.outlier_lines, self.lines[2:])
+
+    def test_no_results(self):
+        for results in (None, _RunResults([], self.lines)):
+            result = vp_finder._to_vp_result(results, self.lines)
+            self.assertEqual(result.vps.shape, (0, 2))
+            self.assertEqual(result.line_groups, [])
+            self.assertIs(result.outlier_lines, self.lines)
@@ -0,0 +1,214 @@
+import pickle
+import unittest
+import weakref
+from unittest import mock
+
+import numpy as np
+
+from vp import geom_tools
+from vp import vp_ransac
+
+
+class TestGetSegmentMidpointVpErrors(unittest.TestCase):
+
+    def test_matches_scalar(self):
+        random_state = np.random.RandomState(0)
+        segments = random_state.randint(0, 600, size=(20, 4)).tolist()
+        vps = random_state.uniform(-1000, 1000, size=(10, 2)).tolist()
+        # Also score each segment's own midpoint.
+        vps += [((x1 + x2) / 2, (y1 + y2) / 2) for x1, y1, x2, y2 in segments]
+        errors = vp_ransac.get_segment_midpoint_vp_errors(segments, vps)
+        self.assertEqual(errors.shape, (len(vps), len(segments)))
+        self.assertEqual(errors.dtype, np.float32)
+        np.testing.assert_allclose(
+            errors,
+            [[vp_ransac.segment_midpoint_vp_error(segment, vp)
+              for segment in segments] for vp in vps],
+            rtol=1e-4, atol=1e-3)
+
+    def test_midpoint_is_vp(self):
+        self.assertEqual(
+            vp_ransac.get_segment_midpoint_vp_errors(
+                [(0, 0, 10, 10)], [(5, 5)]).tolist(),
+            [[0]])
+        self.assertEqual(
+            vp_ransac.segment_midpoint_vp_error((0, 0, 10, 10), (5, 5)), 0)
+
+    def test_no_segments(self):
+        self.assertEqual(
+            vp_ransac.get_segment_midpoint_vp_errors([], [(5, 5)]).shape,
+            (1, 0))
+
+
+class TestNearParallelLines(unittest.TestCase):
+
+    def setUp(self):
+        # The first two lines are nearly parallel, and meet around x=1e21.
+        self.lines = [(0, 0, 10, 1e-30), (0, 1e-10, 10, 1e-10), (3, 0, 3, 10)]
+        self.far_vp = geom_tools.find_intersection(
+            self.lines[0], self.lines[1])
+
+    def test_far_vp_errors(self):
+        np.testing.assert_allclose(
+            vp_ransac.get_segment_midpoint_vp_errors(self.lines, [self.far_vp]),
+            [[vp_ransac.segment_midpoint_vp_error(line, self.far_vp)
+              for line in self.lines]],
+            atol=1e-5)
+
+    def test_far_vp_not_chosen(self):
+        vx, vy = vp_ransac.choose_best_vp_by_max_error(self.lines)
+        self.assertAlmostEqual(vx, 3)
+        self.assertAlmostEqual(vy, 0)
+
+    def test_vp_beyond_float32(self):
+        errors = vp_ransac.get_segment_midpoint_vp_errors(
+            self.lines, [(1e300, 0), (np.inf, 0), (np.nan, 0)])
+        self.assertTrue(np.all(errors == np.inf))
+
+
+def _choose_best_vp_by_brute_force(lines):
+    """Returns the min over candidate VPs of their max segment error."""
+    return min(
+        max(vp_ransac.segment_midpoint_vp_error(line, vp) for line in lines)
+        for vp in geom_tools.find_all_intersections(lines))
+
+
+class TestChooseBestVpByMaxError(unittest.TestCase):
+
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.line_sets = [
+            random_state.randint(0, 600, size=(num_lines, 4)).tolist()
+            for num_lines in (3, 5, 10, 30)]
+
+    def assert_matches_brute_force(self):
+        for lines in self.line_sets:
+            vp = vp_ransac.choose_best_vp_by_max_error(lines)
+            max_error = max(
+                vp_ransac.segment_midpoint_vp_error(line, vp) for line in lines)
+            self.assertAlmostEqual(
+                max_error, _choose_best_vp_by_brute_force(lines), places=3)
+
+    def test_matches_brute_force(self):
+        self.assert_matches_brute_force()
+
+    def test_matches_brute_force_in_tiny_blocks(self):
+        with mock.patch.object(vp_ransac, 'CANDIDATE_BLOCK_SIZE', 1), \
+                mock.patch.object(vp_ransac, 'MAX_ERROR_BLOCK_SIZE', 1), \
+                mock.patch.object(vp_ransac, 'NUM_BOUND_SEGMENTS', 2), \
+                mock.patch.object(
+                    geom_tools, 'MAX_INTERSECTION_BLOCK_SIZE', 1):
+            self.assert_matches_brute_force()
+
+    def test_ties_go_to_earliest_candidate(self):
+        # (0, 0) and (2, 0) both have a max error of 2 / sqrt(5).
+        lines = [(0, 0, 2, 0), (0, 0, 0, 2), (2, 0, 2, 2)]
+        self.assertEqual(
+            vp_ransac.choose_best_vp_by_max_error(lines), (0, 0))
+        self.assertEqual(
+            vp_ransac.choose_best_vp_by_max_error(
+                [lines[0], lines[2], lines[1]]),
+            (2, 0))
+        with mock.patch.object(vp_ransac, 'CANDIDATE_BLOCK_SIZE', 1), \
+                mock.patch.object(
+                    geom_tools, 'MAX_INTERSECTION_BLOCK_SIZE', 1):
+            self.assertEqual(
+                vp_ransac.choose_best_vp_by_max_error(lines), (0, 0))
+            self.assertEqual(
+                vp_ransac.choose_best_vp_by_max_error(
+                    [lines[0], lines[2], lines[1]]),
+                (2, 0))
+
+    def test_two_lines(self):
+        self.assertEqual(
+            vp_ransac.choose_best_vp_by_max_error(
+                [(0, 0, 1, 1), (0, 10, 10, 0)]),
+            (5, 5))
+
+    def test_no_candidates(self):
+        self.assertIsNone(vp_ransac.choose_best_vp_by_max_error([]))
+        self.assertIsNone(vp_ransac.choose_best_vp_by_max_error(
+            [(0, 0, 1, 1), (0, 2, 1, 3), (0, 4, 1, 5)]))
+
+
+class TestMaxCandidates(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = np.random.RandomState(0).randint(
+            0, 600, size=(30, 4)).tolist()
+
+    def test_same_seed_same_vp(self):
+        vp = vp_ransac.choose_best_vp_by_max_error(
+            self.lines, max_candidates=20, random_seed=3)
+        self.assertEqual(
+            vp_ransac.choose_best_vp_by_max_error(
+                self.lines, max_candidates=20, random_seed=3),
+            vp)
+        self.assertIn(
+            vp, [tuple(point) for point in
+                 geom_tools.find_all_intersection_points(self.lines).tolist()])
+
+    def test_enough_candidates_matches_full_scan(self):
+        num_candidates = len(
+            geom_tools.find_all_intersection_points(self.lines))
+        full_scan_vp = vp_ransac.choose_best_vp_by_max_error(self.lines)
+        for max_candidates in (num_candidates, num_candidates + 1):
+            self.assertEqual(
+                vp_ransac.choose_best_vp_by_max_error(
+                    self.lines, max_candidates=max_candidates),
+                full_scan_vp)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            vp_ransac.choose_best_vp_by_max_error(self.lines, max_candidates=0)
+        with self.assertRaises(ValueError):
+            vp_ransac.SegmentVPModel(max_candidates=0)
+
+
+class TestSegmentVPModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = vp_ransac.SegmentVPModel()
+        self.data = np.array(
+            [(0, 0, 10, 0), (0, 5, 10, 5), (3, 0, 3, 10)], dtype=np.float32)
+
+    def test_residuals(self):
+        vp = (20, 10)
+        np.testing.assert_allclose(
+            self.model.get_residuals(self.data, vp),
+            [vp_ransac.segment_midpoint_vp_error(line, vp)
+             for line in self.data],
+            rtol=1e-6)
+
+    def test_geometry_cache_hit(self):
+        geometry = self.model._get_segment_geometry(self.data)
+        self.assertIs(self.model._get_segment_geometry(self.data), geometry)
+
+    def test_geometry_cache_miss(self):
+        geometry = self.model._get_segment_geometry(self.data)
+        other_data = self.data.copy()
+        self.assertIsNot(
+            self.model._get_segment_geometry(other_data), geometry)
+        self.assertIsNot(self.model._get_segment_geometry(self.data), geometry)
+
+    def test_geometry_cache_list(self):
+        lines = self.data.tolist()
+        geometry = self.model._get_segment_geometry(lines)
+        self.assertIsNot(self.model._get_segment_geometry(lines), geometry)
+
+    def test_geometry_cache_releases_data(self):
+        self.model._get_segment_geometry(self.data)
+        data_ref = weakref.ref(self.data)
+        del self.data
+        self.assertIsNone(data_ref())
+
+    def test_pickle_after_residuals(self):
+        self.model.max_candidates = 20
+        self.model.get_residuals(self.data, (20, 10))
+        model = pickle.loads(pickle.dumps(self.model))
+        self.assertIsNone(model._segment_geometry_cache)
+        self.assertEqual(model.max_candidates, 20)
+        self.assertIsNotNone(self.model._segment_geometry_cache)
+        np.testing.assert_array_equal(
+            model.get_residuals(self.data, (20, 10)),
+            self.model.get_residuals(self.data, (20, 10)))
@@ -1,4 +1,4 @@
-import math
+import collections
 
 import cv2
 import numpy as np
@@ -21,7 +21,7 @@ def find_vanishing_points_in_image(
     estimated locations.
 
     Args:
-        image: OpenCV image.
+        image: OpenCV image, either BGR or already grayscale.
         line_detection_options: LineDetectionOptions instance. If None,
             a default instance is used.
         ransac_options: RansacOptions instance. If None, a default instance
@@ -30,10 +30,7 @@ def find_vanishing_points_in_image(
             is used to choose VP models instead of J-linkage.
 
     Returns:
-        Tuple of:
-            1) Dict of vanishing point tuple to line set.
-            2) List of lines that were rejected by all models, if any.
-        Both items may be empty if a valid model was never found.
+        VPResult instance. It has no VPs if a valid model was never found.
     """
     if line_detection_options is None:
         line_detection_options = LineDetectionOptions()
@@ -45,11 +42,25 @@ def find_vanishing_points_in_image(
     if x_ransac_options is None:
         return _find_vanishing_points_j_linkage(lines, ransac_options)
     else:
-        image_height, image_width, _ = image.shape
-        image_diagonal_length = round(
-            math.sqrt(image_height ** 2 + image_width ** 2))
         return _find_vanishing_points_x_ransac(
-            lines, ransac_options, x_ransac_options, image_diagonal_length)
+            lines, ransac_options, x_ransac_options)
+
+
+class VPResult(collections.namedtuple(
+        'VPResult', ['vps', 'line_groups', 'outlier_lines'])):
+    """Vanishing points found in an image.
+
+    Attributes:
+        vps: (K, 2) float64 array of vanishing points.
+        line_groups: List of K line sets, the inlier lines of each VP.
+        outlier_lines: Lines that were rejected by all models, if any.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        """Returns a dict of vanishing point tuple to line set."""
+        return {tuple(vp): lines
+                for vp, lines in zip(self.vps.tolist(), self.line_groups)}
 
 
 class LineDetectionOptions(object):
@@ -75,7 +86,7 @@ class RansacOptions(object):
             max_iterations=10000,
             random_seed=0):
         if model is None:
-            model = vp_ransac.SegmentVPModel()
+            model = vp_ransac.SegmentVPModel(random_seed=random_seed)
         self.model = model
         self.num_sample_points = num_sample_points
         self.inlier_threshold = inlier_threshold
@@ -103,14 +114,15 @@ def _detect_lines(image, options):
     """Finds lines in an image.
 
     Args:
-        image: OpenCV image.
+        image: OpenCV image, either BGR or already grayscale.
         options: LineDetectionOptions instance.
 
     Returns:
-        List of lines in [x1, y1, x2, y2] format.
+        (N, 4) float32 array of lines in [x1, y1, x2, y2] format.
     """
-    image = image.copy()
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # Neither step modifies the input, so there's no need to copy it.
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     lines = line_detector.lsd_lines(
         image,
         min_line_length=options.min_edge_length,
@@ -123,16 +135,13 @@ def _find_vanishing_points_x_ransac(
     """Runs XRansac on a given line set to detect vanishing points.
 
     Args:
-        lines: List of lines specified as (x1, y1, x2, y2),
+        lines: (N, 4) array of lines specified as (x1, y1, x2, y2),
             i.e. two points on the line.
         ransac_options: RansacOptions instance.
         x_ransac_options: XRansacOptions instance.
 
     Returns:
-        Tuple of:
-            1) Dict of vanishing point tuple to line set.
-            2) List of lines that were rejected by all models, if any.
-        Both items may be empty if a valid model was never found.
+        VPResult instance. It has no VPs if a valid model was never found.
     """
     stop_iterations = ransac.calculate_xransac_iterations(
         ransac_options.num_sample_points,
@@ -148,26 +157,20 @@ def _find_vanishing_points_x_ransac(
         random_seed=ransac_options.random_seed,
         residual_histogram_num_bins=x_ransac_options.residual_histogram_num_bins,
         min_prominence=x_ransac_options.min_prominence)
-    results = ransac_inst.run(np.array(lines))
-    if not results or len(results.get_model_results()) == 0:
-        return {}, lines
-    vp_to_inliers = {r.fit: r.inliers for r in results.get_model_results()}
-    return vp_to_inliers, results.get_global_outliers()
+    results = ransac_inst.run(np.asarray(lines, dtype=np.float32))
+    return _to_vp_result(results, lines)
 
 
 def _find_vanishing_points_j_linkage(lines, options):
     """Runs J-linkage on a given line set to detect vanishing points.
 
     Args:
-        lines: List of lines specified as (x1, y1, x2, y2),
+        lines: (N, 4) array of lines specified as (x1, y1, x2, y2),
             i.e. two points on the line.
         options: RansacOptions instance.
 
     Returns:
-        Tuple of:
-            1) Dict of vanishing point tuple to line set.
-            2) List of lines that were rejected by all models, if any.
-        Both items may be empty if a valid model was never found.
+        VPResult instance. It has no VPs if a valid model was never found.
     """
     stop_iterations = ransac.calculate_ransac_iterations(
         options.num_sample_points,
@@ -180,8 +183,24 @@ def _find_vanishing_points_j_linkage(lines, options):
         inlier_threshold=options.inlier_threshold,
         stop_iterations=stop_iterations,
         random_seed=options.random_seed)
-    results = j_link.run(np.array(lines))
+    results = j_link.run(np.asarray(lines, dtype=np.float32))
+    return _to_vp_result(results, lines)
+
+
+def _to_vp_result(results, lines):
+    """Collects the models found by a RANSAC run.
+
+    Args:
+        results: The run's results, if any.
+        lines: (N, 4) array of all lines the run was given.
+
+    Returns:
+        VPResult instance.
+    """
     if not results or len(results.get_model_results()) == 0:
-        return {}, lines
-    vp_to_inliers = {r.fit: r.inliers for r in results.get_model_results()}
-    return vp_to_inliers, results.get_global_outliers()
+        return VPResult(np.empty((0, 2)), [], lines)
+    model_results = results.get_model_results()
+    return VPResult(
+        np.array([r.fit for r in model_results], dtype=np.float64).reshape(-1, 2),
+        [r.inliers for r in model_results],
+        results.get_global_outliers())
@@ -1,17 +1,64 @@
+import math
+import weakref
+
 import numpy as np
 
 import ransac
 from vp import geom_tools
 
-    
+# Maximum number of segment errors held in memory at once when scoring
+# candidate vanishing points.
+MAX_ERROR_BLOCK_SIZE = 2 ** 20
+# Number of candidate vanishing points fully scored at once, between checks
+# of whether the rest can be pruned.
+CANDIDATE_BLOCK_SIZE = 256
+# Number of segments used to cheaply bound each candidate's error.
+NUM_BOUND_SEGMENTS = 8
+
+
 class SegmentVPModel(ransac.Model):
     """Fits a vanishing point to a set of lines.
 
     The error measure is segment_midpoint_vp_error().
+
+    RANSAC scores every hypothesis against the same data array, so
+    get_residuals() reuses per-segment geometry while it's called with the
+    same array. The array must not be modified in place between calls; pass a
+    new array instead.
+
+    Args:
+        max_candidates: Integer, passed to choose_best_vp_by_max_error() when
+            fitting. None scores every candidate VP.
+        random_seed: Integer seed for candidate subsampling.
+
+    Raises:
+        ValueError: If max_candidates is less than 1.
     """
 
+    def __init__(self, max_candidates=None, random_seed=0):
+        super(SegmentVPModel, self).__init__()
+        _check_max_candidates(max_candidates)
+        self.max_candidates = max_candidates
+        self.random_seed = random_seed
+        # Geometry for the most recent data array, as a (weak reference to
+        # data, geometry) tuple. The weak reference means the model doesn't
+        # keep the data alive after a run.
+        self._segment_geometry_cache = None
+
+    def __getstate__(self):
+        # The cache holds a weak reference, which can't be pickled, and is
+        # only useful within a run anyway.
+        state = self.__dict__.copy()
+        state['_segment_geometry_cache'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def fit(self, data):
-        best_vp_point = choose_best_vp_by_max_error(data)
+        best_vp_point = choose_best_vp_by_max_error(
+            data, max_candidates=self.max_candidates,
+            random_seed=self.random_seed)
         if best_vp_point is None:
             raise ransac.DegenerateModelException()
         return best_vp_point
@@ -20,30 +67,237 @@ class SegmentVPModel(ransac.Model):
         return None
 
     def get_residuals(self, data, best_vp_point):
-        residuals = np.array([
-            segment_midpoint_vp_error(segment, best_vp_point)
-            for segment in data])
-        return residuals
+        vx, vy = best_vp_point
+        with np.errstate(over='ignore'):
+            vx, vy = np.float32(vx), np.float32(vy)
+        return _get_vp_coord_errors(self._get_segment_geometry(data), vx, vy)
+
+    def _get_segment_geometry(self, data):
+        cache = self._segment_geometry_cache
+        if cache is not None and cache[0]() is data:
+            return cache[1]
+        segment_geometry = _get_segment_geometry(data)
+        try:
+            self._segment_geometry_cache = (weakref.ref(data), segment_geometry)
+        except TypeError:
+            # Lists and such can't be weakly referenced, so aren't cached.
+            self._segment_geometry_cache = None
+        return segment_geometry
 
 
-def choose_best_vp_by_max_error(lines):
+def choose_best_vp_by_max_error(lines, max_candidates=None, random_seed=0):
     """Finds the vanishing point that minimizes error among lines.
 
     Candidates vps are intersections of the lines.
     The error measure is segment_midpoint_vp_error().
 
+    Args:
+        lines: List or (N, 4) array of lines in (x1, y1, x2, y2) format.
+        max_candidates: Integer. If there are more candidate VPs than this,
+            only a uniform random sample of this many is scored, so the
+            result is approximate. None scores every candidate.
+        random_seed: Integer seed for the candidate sample, so repeated
+            calls on the same lines agree.
+
     Returns:
         Vanishing point tuple, or None if detection fails.
+
+    Raises:
+        ValueError: If max_candidates is less than 1.
+    """
+    _check_max_candidates(max_candidates)
+    if len(lines) < 2:
+        return None
+    if len(lines) == 2:
+        # A minimal sample has a single candidate, so there's nothing to score.
+        return geom_tools.find_intersection(lines[0], lines[1])
+    if max_candidates is None:
+        # Candidates are scored as they're generated, so all O(N^2) of them
+        # are never held in memory at once.
+        candidate_blocks = geom_tools.iter_intersection_points(lines)
+    else:
+        intersections = geom_tools.find_all_intersection_points(lines)
+        if len(intersections) > max_candidates:
+            # Sorting the sample keeps ties going to the earliest candidate.
+            sample = np.random.RandomState(random_seed).choice(
+                len(intersections), max_candidates, replace=False)
+            intersections = intersections[np.sort(sample)]
+        candidate_blocks = [intersections]
+
+    segment_geometry = _get_segment_geometry(lines)
+    # A segment's error is at most half its length, so the max error over the
+    # longest few segments is a cheap and fairly tight lower bound on the max
+    # error over all of them. Squared lengths sort the same, without a sqrt.
+    _, _, endpoint_dxs, endpoint_dys = segment_geometry
+    squared_half_lengths = (
+        endpoint_dxs * endpoint_dxs + endpoint_dys * endpoint_dys)
+    num_bound_segments = min(NUM_BOUND_SEGMENTS, len(squared_half_lengths))
+    bound_indices = np.argpartition(
+        -squared_half_lengths, num_bound_segments - 1)[:num_bound_segments]
+    bound_geometry = tuple(a[bound_indices] for a in segment_geometry)
+
+    best_vp_point = None
+    best_error = math.inf
+    for candidates in candidate_blocks:
+        if len(candidates) == 0:
+            continue
+        # Blocks arrive in candidate order, so a later block only wins if
+        # it's strictly better.
+        index, error = _find_best_candidate(
+            segment_geometry, bound_geometry, candidates, best_error)
+        if index is not None:
+            best_vp_point = tuple(candidates[index].tolist())
+            best_error = error
+    return best_vp_point
+
+
+def _check_max_candidates(max_candidates):
+    if max_candidates is not None and max_candidates < 1:
+        raise ValueError('max_candidates must be at least 1.')
+
+
+def _find_best_candidate(
+        segment_geometry, bound_geometry, candidates, max_error):
+    """Finds the candidate VP with the lowest max segment error.
+
+    Args:
+        segment_geometry: Tuple, as returned by _get_segment_geometry().
+        bound_geometry: Tuple, segment_geometry for a subset of the segments,
+            used to bound each candidate's error from below.
+        candidates: (M, 2) array of candidate vanishing points.
+        max_error: Float. Only candidates with a lower error are considered.
+
+    Returns:
+        Tuple of the best candidate's index and its error. Ties go to the
+        earliest candidate. The index is None if no candidate beats max_error.
+    """
+    lower_bounds = _get_vp_errors(bound_geometry, candidates).max(axis=1)
+    # Fully score the most promising candidates first, and stop once no
+    # remaining candidate's lower bound could beat the best found so far.
+    candidate_order = np.argsort(lower_bounds, kind='stable')
+    num_segments = len(segment_geometry[0])
+    block_size = max(1, min(
+        CANDIDATE_BLOCK_SIZE, MAX_ERROR_BLOCK_SIZE // num_segments))
+    best_index = None
+    best_error = max_error
+    for block_start in range(0, len(candidate_order), block_size):
+        block = candidate_order[block_start:block_start + block_size]
+        block = block[lower_bounds[block] <= best_error]
+        if len(block) == 0:
+            break
+        max_errors = _get_vp_errors(
+            segment_geometry, candidates[block]).max(axis=1)
+        block_best_error = max_errors.min()
+        block_best_index = block[max_errors == block_best_error].min()
+        if block_best_error < best_error or (
+                block_best_error == best_error and best_index is not None and
+                block_best_index < best_index):
+            best_index = block_best_index
+            best_error = block_best_error
+    return best_index, best_error
+
+
+def get_segment_midpoint_vp_errors(segments, vps):
+    """Calculates segment_midpoint_vp_error() for many segments and VPs at once.
+
+    Args:
+        segments: List or (L, 4) array of segments in (x1, y1, x2, y2) format.
+        vps: List or (I, 2) array of vanishing points, i.e. (vx, vy).
+
+    Returns:
+        (I, L) float32 array of errors, one row per VP. A segment whose
+        midpoint is the VP passes through it, so has an error of 0.
+    """
+    return _get_vp_errors(_get_segment_geometry(segments), vps)
+
+
+def _get_segment_geometry(segments):
+    """Precomputes the per-segment terms of segment_midpoint_vp_error().
+
+    These don't depend on the VP, so can be shared by every VP scored
+    against the same segments.
+
+    Args:
+        segments: List or (L, 4) array of segments in (x1, y1, x2, y2) format.
+
+    Returns:
+        Tuple of contiguous (L,) float32 arrays: midpoint x and y coordinates,
+        and x and y offsets from the midpoints to the segments' first endpoints.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    # Columns are kept in separate arrays, so the error kernel streams
+    # through contiguous memory.
+    x1, y1, x2, y2 = segments.T
+    midpoint_xs = (x1 + x2) / 2
+    midpoint_ys = (y1 + y2) / 2
+    # Errors are only compared against pixel scale thresholds, so single
+    # precision is plenty, and halves the kernel's memory traffic.
+    return tuple(
+        np.ascontiguousarray(a, dtype=np.float32)
+        for a in (midpoint_xs, midpoint_ys, x1 - midpoint_xs, y1 - midpoint_ys))
+
+
+def _get_vp_errors(segment_geometry, vps):
+    """Calculates segment errors from precomputed segment geometry.
+
+    Args:
+        segment_geometry: Tuple, as returned by _get_segment_geometry().
+        vps: List or (I, 2) array of vanishing points, i.e. (vx, vy).
+
+    Returns:
+        (I, L) float32 array of errors, as get_segment_midpoint_vp_errors().
+    """
+    # VPs beyond float32's range become inf, which the kernel scores as inf.
+    with np.errstate(over='ignore'):
+        vps = np.asarray(vps, dtype=np.float32).reshape(-1, 2)
+    return _get_vp_coord_errors(segment_geometry, vps[:, 0:1], vps[:, 1:2])
+
+
+def _get_vp_coord_errors(segment_geometry, vp_xs, vp_ys):
+    """Calculates segment errors for VPs given by their coordinates.
+
+    This is the kernel behind _get_vp_errors(). RANSAC scores one VP at a
+    time, so it's called directly with scalar coordinates then, which skips
+    broadcasting over a VP axis.
+
+    Args:
+        segment_geometry: Tuple, as returned by _get_segment_geometry().
+        vp_xs: float32 scalar, or (I, 1) float32 array of VP x coordinates.
+        vp_ys: float32 scalar, or (I, 1) float32 array of VP y coordinates.
+
+    Returns:
+        (L,) float32 array of errors for scalar coordinates, otherwise
+        (I, L) float32 array of errors. Errors for infinite or NaN VP
+        coordinates are inf.
     """
-    intersections = geom_tools.find_all_intersections(lines)
-    best_vp = None
-    best_vp_error = None
-    for point in intersections:
-        error = max([segment_midpoint_vp_error(l, point) for l in lines])
-        if best_vp is None or error < best_vp_error:
-            best_vp = point
-            best_vp_error = error
-    return best_vp
+    midpoint_xs, midpoint_ys, endpoint_dxs, endpoint_dys = segment_geometry
+    vp_dxs = vp_xs - midpoint_xs
+    vp_dys = vp_ys - midpoint_ys
+    # Candidates are raw line intersections, which can be arbitrarily far off
+    # for near-parallel lines, and would overflow the squared norm and cross
+    # product. Only the direction to the VP matters, so the offsets are first
+    # scaled down by their larger magnitude, as np.hypot does internally.
+    scales = np.maximum(np.abs(vp_dxs), np.abs(vp_dys))
+    np.divide(1, scales, out=scales, where=scales > 0)
+    with np.errstate(invalid='ignore'):
+        # Infinite offsets become NaN here, and are handled below.
+        vp_dxs *= scales
+        vp_dys *= scales
+    # Distance from each segment's first endpoint to the line through its
+    # midpoint and the VP, via the cross product.
+    nominators = vp_dxs * endpoint_dys
+    nominators -= vp_dys * endpoint_dxs
+    np.abs(nominators, out=nominators)
+    denominators = vp_dxs * vp_dxs
+    denominators += vp_dys * vp_dys
+    np.sqrt(denominators, out=denominators)
+    errors = np.divide(
+        nominators, denominators,
+        out=np.zeros_like(nominators), where=denominators > 0)
+    # VPs too far off for float32, or NaN, have no usable direction, so they
+    # can't be a good fit for anything.
+    errors[np.isnan(denominators)] = np.inf
+    return errors
 
 
 def segment_midpoint_vp_error(segment, vp):
@@ -57,10 +311,17 @@ def segment_midpoint_vp_error(segment, vp):
         vp: Tuple of vanishing point, i.e. (vx, vy).
 
     Returns:
-        Float, error amount.
+        Float, error amount. A segment whose midpoint is the VP passes
+        through it, so has an error of 0.
     """
-    sx1, sy1, sx2, sy2 = segment
-    vx, vy = vp
-    cx, cy = geom_tools.get_midpoint((sx1, sy1), (sx2, sy2))
-    vp_midpoint_line = (cx, cy, vx, vy)
-    return geom_tools.point_to_line_dist((sx1, sy1), vp_midpoint_line)
+    sx1, sy1, sx2, sy2 = map(float, segment)
+    vx, vy = map(float, vp)
+    # The geom_tools midpoint and point-to-line distance, inlined.
+    cx = (sx1 + sx2) / 2
+    cy = (sy1 + sy2) / 2
+    dx = vx - cx
+    dy = vy - cy
+    vp_midpoint_dist = math.hypot(dx, dy)
+    if vp_midpoint_dist == 0:
+        return 0.0
+    return abs(dx * (sy1 - cy) - dy * (sx1 - cx)) / vp_midpoint_dist